@@ -2,6 +2,17 @@ import streamlit as st
 import firebase_admin
 from firebase_admin import db as realtimedb
 import pandas as pd
+import os
+import tempfile
+
+import data_transfer
+import metrics
+import price_watch
+import resilience
+import session_cache
+
+# Streamlit keeps a download's bytes in memory for the session, so larger backups go through the CLI
+MAX_DASHBOARD_EXPORT_BYTES = 50 * 1024 * 1024
 
 def main():
     uid = st.session_state.get("uid", None)
@@ -48,6 +59,88 @@ def main():
         else:
             st.info("🌍 No actions taken yet. Flip a few switches to make the magic happen.")
 
+        # 📈 Latency of outbound calls and page renders in this server process
+        st.subheader("📈 Performance")
+        perf = metrics.snapshot()
+        if perf:
+            perf_df = pd.DataFrame(perf).round({"error_rate": 3, "mean_ms": 1, "p50_ms": 1, "p95_ms": 1, "p99_ms": 1})
+            st.dataframe(perf_df, use_container_width=True, hide_index=True)
+            st.bar_chart(perf_df.set_index("endpoint")[["p50_ms", "p95_ms", "p99_ms"]], horizontal=True)
+
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                st.download_button("⬇️ Export Prometheus Metrics", metrics.prometheus_text(), file_name="plane_n_simple.prom", mime="text/plain")
+            with col2:
+                if st.button("♻️ Reset Metrics"):
+                    metrics.reset()
+                    st.rerun()
+        else:
+            st.info("No calls recorded yet in this server process.")
+        breakers = resilience.breaker_states()
+        if breakers:
+            st.caption("Circuit breakers: " + ", ".join(f"{provider} {state}" for provider, state in sorted(breakers.items())))
+
+        # 🧠 Search results held in memory by each session in this server process
+        st.subheader("🧠 Session Memory")
+        session_rows, total_bytes = session_cache.report()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Active Sessions", len(session_rows))
+        col2.metric("Cached Results", f"{total_bytes / 1024:.1f} KB")
+        col3.metric("Per-Session Budget", f"{session_cache.session_budget_bytes() / 1024:.0f} KB")
+        if session_rows:
+            st.dataframe(pd.DataFrame(session_rows), use_container_width=True, hide_index=True)
+
+        # 🔔 Background re-pricing of watched flights
+        st.subheader("🔔 Price Watch")
+        if price_watch.settings()["enabled"]:
+            watcher = price_watch.start_worker()
+            st.json(watcher.status, expanded=False)
+            if st.button("🔄 Re-price Watched Flights Now"):
+                with st.spinner("Re-pricing watched flights..."):
+                    status = watcher.run_cycle()
+                if status is None:
+                    st.info("ℹ️ A re-pricing cycle is already running. Check back in a moment.")
+                else:
+                    st.rerun()
+        else:
+            st.info("Price watching is off. Set `enabled = true` under `[price_watch]` in secrets.toml to turn it on.")
+
+        # 💾 Streaming backup and restore of users and travel plans
+        st.subheader("💾 Backup & Restore")
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            if st.button("📦 Export Users & Travel Plans"):
+                # The export streams to its own temp file, so concurrent exports never collide.
+                # Only archives up to MAX_DASHBOARD_EXPORT_BYTES are read back for download.
+                with tempfile.NamedTemporaryFile(prefix="plane_n_simple_export_", suffix=".jsonl.gz") as f:
+                    with st.spinner("Exporting..."):
+                        stats = data_transfer.export_jsonl(f)
+                    size = f.tell()
+                    st.success(f"✅ Exported {stats['users']} users and {stats['travel_plans']} travel plans "
+                               f"in {stats['seconds']}s ({stats['records_per_second']} records/s), {size / 1024:,.0f} KB.")
+                    if size <= MAX_DASHBOARD_EXPORT_BYTES:
+                        f.seek(0)
+                        st.download_button("⬇️ Download Backup", f.read(), file_name="plane_n_simple_backup.jsonl.gz", mime="application/gzip")
+                    else:
+                        st.warning(f"⚠️ This backup is larger than {MAX_DASHBOARD_EXPORT_BYTES // 1024 // 1024} MB, too big to download "
+                                   "from the dashboard. Run the export on the server instead:")
+                        st.code("python data_transfer.py export backup.jsonl.gz", language="bash")
+        with col2:
+            backup = st.file_uploader("Restore from a .jsonl.gz backup", type=["gz"])
+            if backup and st.button("♻️ Import Backup"):
+                source_id = data_transfer.file_fingerprint(backup.getvalue())
+                checkpoint_path = os.path.join(tempfile.gettempdir(), f"plane_n_simple_import_{source_id}.json")
+                progress = st.empty()
+                try:
+                    stats = data_transfer.import_jsonl(backup, checkpoint_path, source_id,
+                                                       progress=lambda n: progress.caption(f"Imported {n} lines..."))
+                    progress.empty()
+                    resumed = f" (resumed after line {stats['resumed_from_line']})" if stats["resumed_from_line"] else ""
+                    st.success(f"✅ Imported {stats['users']} users and {stats['travel_plans']} travel plans{resumed} "
+                               f"in {stats['seconds']}s ({stats['records_per_second']} records/s).")
+                except Exception as e:
+                    st.error(f"❌ Import stopped: {e}. Run it again with the same file to resume.")
+
         # 📋 Display All Users
         st.subheader("👥 User Accounts Overview")
 
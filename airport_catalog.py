@@ -0,0 +1,15 @@
+# airport_catalog.py
+# The airports.csv catalog used by the search pages, read once per process.
+import streamlit as st
+import pandas as pd
+
+import metrics
+
+@st.cache_data
+def load_airports(csv_file="airports.csv"):
+    with metrics.timed("csv.airports"):
+        df = pd.read_csv(csv_file)
+        df = df.dropna(subset=["iata_code"])
+        df["display_name"] = df["iata_code"].str.upper() + " - " + df["name"].str.strip()
+        df = df.drop_duplicates(subset=["display_name"])
+    return df
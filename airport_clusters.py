@@ -0,0 +1,126 @@
+import json
+import numpy as np
+import pandas as pd
+
+# (label, grid cell size in degrees, initial map zoom). A cell size of None means no clustering.
+DETAIL_LEVELS = [
+    ("Continents", 20.0, 1),
+    ("Regions", 5.0, 2),
+    ("Metro Areas", 1.0, 4),
+    ("Airports", None, 6),
+]
+
+# Levels with more points than this are not offered for the whole world, so no detail level
+# ships a huge payload; the finer levels of a big catalog are served per region tile instead
+MAX_LEVEL_POINTS = 5000
+# Region tiles are halved until each holds at most MAX_LEVEL_POINTS airports, or this deep
+MAX_TILE_DEPTH = 12
+WORLD_BOUNDS = (-90.0, 90.0, -180.0, 180.0)
+
+
+def cluster_airports(df, cell_deg):
+    # Grid aggregation: one point per occupied cell, placed at the mean of its airports
+    cells = pd.DataFrame({
+        "lat_cell": np.floor(df["latitude"].to_numpy() / cell_deg),
+        "lon_cell": np.floor(df["longitude"].to_numpy() / cell_deg),
+        "latitude": df["latitude"].to_numpy(),
+        "longitude": df["longitude"].to_numpy(),
+        "iata_code": df["iata_code"].fillna("").to_numpy(),
+    })
+    grouped = cells.groupby(["lat_cell", "lon_cell"], sort=False).agg(
+        latitude=("latitude", "mean"),
+        longitude=("longitude", "mean"),
+        count=("iata_code", "size"),
+        example=("iata_code", "first"),
+    )
+
+    radius = cell_deg * 111_320 * 0.15 * np.sqrt(grouped["count"] / grouped["count"].max()) + cell_deg * 5_000
+    labels = [
+        f"<b>{example}</b>" if count == 1 else f"<b>{count} airports</b><br/>incl. {example}"
+        for count, example in zip(grouped["count"], grouped["example"])
+    ]
+    return pd.DataFrame({
+        "latitude": grouped["latitude"].round(4).to_numpy(),
+        "longitude": grouped["longitude"].round(4).to_numpy(),
+        "radius": radius.round().to_numpy(),
+        "label": labels,
+    }).to_dict("records")
+
+
+def individual_airports(df):
+    labels = [
+        f"<b>{name}</b><br/><b>{code}</b><br/><b>{lat}, {lon}</b>"
+        for name, code, lat, lon in zip(df["name"], df["iata_code"], df["latitude"], df["longitude"])
+    ]
+    return pd.DataFrame({
+        "latitude": df["latitude"].round(4).to_numpy(),
+        "longitude": df["longitude"].round(4).to_numpy(),
+        "radius": 20000,
+        "label": labels,
+    }).to_dict("records")
+
+
+def build_detail_levels(df):
+    levels = {}
+    for label, cell_deg, zoom in DETAIL_LEVELS:
+        if cell_deg is None:
+            if len(df) > MAX_LEVEL_POINTS:
+                continue
+            records = individual_airports(df)
+        else:
+            records = cluster_airports(df, cell_deg)
+            if len(records) > MAX_LEVEL_POINTS:
+                continue
+        levels[label] = {"records": records, "zoom": zoom}
+    return levels
+
+
+def split_tiles(df, bounds=WORLD_BOUNDS, depth=0):
+    # Quadtree over (south, north, west, east): returns [(bounds, airports)] for non-empty tiles
+    if df.empty:
+        return []
+    if len(df) <= MAX_LEVEL_POINTS or depth >= MAX_TILE_DEPTH:
+        return [(bounds, df)]
+    south, north, west, east = bounds
+    mid_lat, mid_lon = (south + north) / 2, (west + east) / 2
+    north_half = df["latitude"] >= mid_lat
+    east_half = df["longitude"] >= mid_lon
+    tiles = []
+    for lat_bounds, in_lat in (((mid_lat, north), north_half), ((south, mid_lat), ~north_half)):
+        for lon_bounds, in_lon in (((west, mid_lon), ~east_half), ((mid_lon, east), east_half)):
+            tiles += split_tiles(df[in_lat & in_lon], lat_bounds + lon_bounds, depth + 1)
+    return tiles
+
+
+def tile_label(bounds):
+    # (25.0, 47.5, -90.0, -45.0) -> "25°N–47.5°N, 90°W–45°W"
+    def degrees(value, positive, negative):
+        return "0°" if value == 0 else f"{abs(value):g}°{positive if value > 0 else negative}"
+    south, north, west, east = bounds
+    return f"{degrees(south, 'N', 'S')}–{degrees(north, 'N', 'S')}, {degrees(west, 'E', 'W')}–{degrees(east, 'E', 'W')}"
+
+
+def build_tiles(df):
+    # Every detail level of each region tile, precomputed; empty when the whole catalog fits the world levels
+    if len(df) <= MAX_LEVEL_POINTS:
+        return {}
+    tiles = {}
+    for bounds, subset in sorted(split_tiles(df), key=lambda tile: (-tile[0][1], tile[0][2])):
+        tiles[tile_label(bounds)] = {
+            "bounds": bounds,
+            "count": len(subset),
+            "latitude": subset["latitude"].mean(),
+            "longitude": subset["longitude"].mean(),
+            "levels": build_detail_levels(subset),
+        }
+    return tiles
+
+
+def tile_zoom(bounds):
+    # Map zoom that roughly fits the tile's width
+    south, north, west, east = bounds
+    return max(1, int(np.log2(360 / max(east - west, 2 * (north - south)))) + 1)
+
+
+def payload_bytes(records):
+    return len(json.dumps(records, separators=(",", ":")))
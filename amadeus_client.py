@@ -0,0 +1,124 @@
+# amadeus_client.py
+# Amadeus flight-offers client shared by the flight search page and the price watcher.
+# Calls go through resilience.call, so they honour the current action's deadline and
+# the provider's circuit breaker.
+import streamlit as st
+import threading
+import time
+
+import metrics
+import resilience
+
+AMADEUS_BASE_URL = "https://test.api.amadeus.com"
+
+# Amadeus tokens last ~30 minutes; reuse one per process instead of fetching one per search
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+_token_lock = threading.Lock()
+_token_cache = {"token": None, "expires": 0.0}
+
+def amadeus_base_url():
+    # secrets.toml may point [amadeus] base_url at another host, e.g. the local benchmark fakes
+    try:
+        return st.secrets["amadeus"].get("base_url", AMADEUS_BASE_URL)
+    except Exception:
+        return AMADEUS_BASE_URL
+
+class CredentialsError(Exception):
+    # Amadeus credentials are missing from secrets.toml or were rejected
+    pass
+
+def get_amadeus_token():
+    # Raises CredentialsError for missing or rejected credentials, anything else for an outage
+    with _token_lock:
+        if _token_cache["token"] and time.time() < _token_cache["expires"]:
+            return _token_cache["token"]
+
+    try:
+        client_id = st.secrets["amadeus"]["client_id"]
+        client_secret = st.secrets["amadeus"]["client_secret"]
+    except KeyError as e:
+        raise CredentialsError(f"missing {e}") from e
+
+    url = f"{amadeus_base_url()}/v1/security/oauth2/token"
+    payload = {
+        "grant_type": "client_credentials",
+        "client_id": client_id,
+        "client_secret": client_secret
+    }
+
+    def request(timeout):
+        res = metrics.request("amadeus.token", "POST", url, data=payload, timeout=timeout)
+        resilience.check_status(res, "Amadeus")
+        return res.json()
+
+    try:
+        data = resilience.call("amadeus", "amadeus.token", None, request)
+    except resilience.ClientError as e:
+        raise CredentialsError(str(e)) from e
+    with _token_lock:
+        _token_cache["token"] = data["access_token"]
+        _token_cache["expires"] = time.time() + data.get("expires_in", 0) - TOKEN_EXPIRY_MARGIN_SECONDS
+    return data["access_token"]
+
+
+def fetch_flight_offers(origin_code, dest_code, travel_date):
+    # Raw Amadeus offers. Raises CredentialsError, resilience.ClientError for an invalid search,
+    # and UpstreamError or a requests error for an outage (unless a page action serves a saved result).
+    url = f"{amadeus_base_url()}/v2/shopping/flight-offers"
+    params = {
+        "originLocationCode": origin_code,
+        "destinationLocationCode": dest_code,
+        "departureDate": travel_date.strftime("%Y-%m-%d"),
+        "adults": 1,
+        "currencyCode": "USD",
+        "travelClass": "ECONOMY"
+    }
+    cache_key = ("amadeus.flight_offers", origin_code, dest_code, params["departureDate"])
+
+    try:
+        token = get_amadeus_token()
+    except CredentialsError:
+        raise
+    except Exception as e:
+        # No token, no search: serve the last result for this route if there is one
+        return resilience.fallback("amadeus", cache_key, e)
+
+    def request(timeout):
+        res = metrics.request("amadeus.flight_offers", "GET", url, headers={"Authorization": f"Bearer {token}"}, params=params, timeout=timeout)
+        resilience.check_status(res, "Amadeus")
+        return res.json().get("data", [])
+
+    return resilience.call("amadeus", "amadeus.flight_offers", cache_key, request)
+
+
+def search_amadeus_flights(origin_code, dest_code, travel_date):
+    # fetch_flight_offers for pages: failures become a message and no offers
+    try:
+        return fetch_flight_offers(origin_code, dest_code, travel_date)
+    except CredentialsError as e:
+        st.error(f"🔐 Amadeus credentials problem: {e}")
+        return []
+    except resilience.ClientError:
+        # An invalid search (e.g. same origin and destination); the page reports no flights
+        return []
+    except Exception as e:
+        st.warning(f"⚠️ Amadeus flight search is unavailable right now ({e}). Please try again shortly.")
+        return []
+
+def compact_offer(offer):
+    # Only the fields the page shows or saves; a raw Amadeus offer is several KB
+    itinerary = offer["itineraries"][0]
+    return {
+        "price": offer["price"]["total"],
+        "currency": offer["price"]["currency"],
+        "duration": itinerary.get("duration", "N/A"),
+        "segments": [{
+            "from": segment["departure"]["iataCode"],
+            "to": segment["arrival"]["iataCode"],
+            "carrier": segment.get("carrierCode"),
+            "aircraft": segment.get("aircraft", {}).get("code", "N/A"),
+            "departure": segment["departure"]["at"],
+            "arrival": segment["arrival"]["at"],
+            "duration": segment.get("duration", "N/A"),
+        } for segment in itinerary["segments"]],
+    }
@@ -1,16 +1,21 @@
+import importlib
+import os
 import streamlit as st
 from streamlit_option_menu import option_menu
-import requests
 import firebase_admin
 from firebase_admin import credentials, db as realtimedb
-import pandas as pd
 
-# Internal modules
-import home
-import travel_plans
-import flight_search
-import profile_page
-import poi_search 
+import metrics
+
+# Internal page modules, imported only when their menu entry is selected
+PAGES = {
+    "Home": "home",
+    "Travel Plans": "travel_plans",
+    "Flight Search": "flight_search",
+    "POI Search": "poi_search",
+    "Profile": "profile_page",
+    "Admin": "admin_page",
+}
 
 # Page config with tab title, emoji, and wide layout
 st.set_page_config(
@@ -21,12 +26,10 @@ st.set_page_config(
 )
 
 
-# Safe Firebase config handling
-try:
+@st.cache_resource
+def init_firebase():
+    # Runs once per process; later reruns and sessions reuse the initialized app
     firebase_config = st.secrets["firebase"]
-    FIREBASE_API_KEY = firebase_config["apiKey"]
-    FIREBASE_DB_URL = firebase_config["databaseURL"]
-
     if not firebase_admin._apps:
         cred = credentials.Certificate({
             "type": firebase_config["type"],
@@ -40,30 +43,44 @@ try:
             "client_x509_cert_url": firebase_config["client_x509_cert_url"]
         })
         firebase_admin.initialize_app(cred, {
-            'databaseURL': FIREBASE_DB_URL
+            'databaseURL': firebase_config["databaseURL"]
         })
+    metrics.instrument_firebase()
+    return firebase_config["apiKey"]
 
+# Safe Firebase config handling
+try:
+    FIREBASE_API_KEY = init_firebase()
 except Exception as e:
     st.error("🚨 Critical error: Firebase secrets are missing or misconfigured.")
     st.stop()
 
-# Firebase Auth API endpoints
+# Opt-in background re-pricing of watched flights ([price_watch] enabled = true)
+if st.secrets.get("price_watch", {}).get("enabled", False):
+    importlib.import_module("price_watch").start_worker()
+
+# Firebase Auth API endpoints (FIREBASE_AUTH_EMULATOR_HOST redirects them, as in the Firebase SDKs)
+if os.environ.get("FIREBASE_AUTH_EMULATOR_HOST"):
+    FIREBASE_AUTH_URL = f"http://{os.environ['FIREBASE_AUTH_EMULATOR_HOST']}/identitytoolkit.googleapis.com"
+else:
+    FIREBASE_AUTH_URL = "https://identitytoolkit.googleapis.com"
+
 def firebase_login(email, password):
-    url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_API_KEY}"
+    url = f"{FIREBASE_AUTH_URL}/v1/accounts:signInWithPassword?key={FIREBASE_API_KEY}"
     payload = {"email": email, "password": password, "returnSecureToken": True}
-    res = requests.post(url, json=payload)
+    res = metrics.request("firebase_auth.sign_in", "POST", url, json=payload)
     return res.json()
 
 def firebase_signup(email, password):
-    url = f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={FIREBASE_API_KEY}"
+    url = f"{FIREBASE_AUTH_URL}/v1/accounts:signUp?key={FIREBASE_API_KEY}"
     payload = {"email": email, "password": password, "returnSecureToken": True}
-    res = requests.post(url, json=payload)
+    res = metrics.request("firebase_auth.sign_up", "POST", url, json=payload)
     return res.json()
 
 def firebase_reset_password(email):
-    url = f"https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode?key={FIREBASE_API_KEY}"
+    url = f"{FIREBASE_AUTH_URL}/v1/accounts:sendOobCode?key={FIREBASE_API_KEY}"
     payload = {"requestType": "PASSWORD_RESET", "email": email}
-    res = requests.post(url, json=payload)
+    res = metrics.request("firebase_auth.send_oob_code", "POST", url, json=payload)
     return res.json()
 
 # Session state
@@ -175,16 +192,6 @@ else:
         )
 
     # Page Routing
-    if selected == "Home":
-        home.main()
-    elif selected == "Travel Plans":
-        travel_plans.main()
-    elif selected == "Flight Search":
-        flight_search.main()
-    elif selected == "POI Search":
-        poi_search.main()
-    elif selected == "Profile":
-        profile_page.main()
-    elif selected == "Admin":
-        import admin_page
-        admin_page.main()
\ No newline at end of file
+    with metrics.timed(f"page.{PAGES[selected]}"):
+        page = importlib.import_module(PAGES[selected])
+        page.main()
\ No newline at end of file
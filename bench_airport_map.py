@@ -0,0 +1,88 @@
+# bench_airport_map.py
+# Payload size and build/render time of the home airport map at global scale.
+#
+#   python bench_airport_map.py                # 70k synthetic airports
+#   python bench_airport_map.py --airports 200000
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+import airport_clusters
+
+
+def synthetic_airports(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Uniform in area between the polar circles, rounded like the real catalog
+    lat = np.degrees(np.arcsin(rng.uniform(np.sin(np.radians(-66)), np.sin(np.radians(66)), n)))
+    lon = rng.uniform(-180, 180, n)
+    letters = rng.integers(ord("A"), ord("Z") + 1, (n, 3))
+    codes = ["".join(map(chr, row)) for row in letters]
+    return pd.DataFrame({
+        "name": [f"Synthetic Airport {i}" for i in range(n)],
+        "latitude": lat.round(6),
+        "longitude": lon.round(6),
+        "iata_code": codes,
+    })
+
+
+def deck_json_seconds(records):
+    try:
+        import pydeck as pdk
+    except ImportError:
+        return None
+    deck = pdk.Deck(layers=[pdk.Layer("ScatterplotLayer", data=records, get_position=["longitude", "latitude"], get_radius="radius")])
+    start = time.perf_counter()
+    deck.to_json()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clustered home airport map.")
+    parser.add_argument("--airports", type=int, default=70_000)
+    args = parser.parse_args()
+
+    df = synthetic_airports(args.airports)
+
+    baseline = df.to_dict("records")
+    print(f"{args.airports} airports")
+    print(f"{'level':<14}{'points':>10}{'payload KB':>14}{'build ms':>12}{'to_json ms':>12}")
+
+    json_s = deck_json_seconds(baseline)
+    print(f"{'raw (before)':<14}{len(baseline):>10}{airport_clusters.payload_bytes(baseline) / 1024:>14.1f}{'-':>12}"
+          f"{'-' if json_s is None else f'{json_s * 1000:.1f}':>12}")
+
+    total_build = 0.0
+    for label, cell_deg, _ in airport_clusters.DETAIL_LEVELS:
+        if cell_deg is None and len(df) > airport_clusters.MAX_LEVEL_POINTS:
+            print(f"{label:<14}  per region only: more than {airport_clusters.MAX_LEVEL_POINTS} points")
+            continue
+        start = time.perf_counter()
+        records = airport_clusters.individual_airports(df) if cell_deg is None else airport_clusters.cluster_airports(df, cell_deg)
+        build_s = time.perf_counter() - start
+        total_build += build_s
+        if len(records) > airport_clusters.MAX_LEVEL_POINTS:
+            print(f"{label:<14}  per region only: {len(records)} points is more than {airport_clusters.MAX_LEVEL_POINTS}")
+            continue
+        json_s = deck_json_seconds(records)
+        print(f"{label:<14}{len(records):>10}{airport_clusters.payload_bytes(records) / 1024:>14.1f}{build_s * 1000:>12.1f}"
+              f"{'-' if json_s is None else f'{json_s * 1000:.1f}':>12}")
+
+    print(f"all levels built once per process in {total_build * 1000:.1f} ms")
+
+    # Finer levels of a large catalog are served per region tile
+    start = time.perf_counter()
+    tiles = airport_clusters.build_tiles(df)
+    tiles_s = time.perf_counter() - start
+    if tiles:
+        print(f"\n{len(tiles)} region tiles built in {tiles_s * 1000:.1f} ms")
+        print(f"{'level':<14}{'tiles':>10}{'max points':>14}{'max KB':>12}")
+        for label, _, _ in airport_clusters.DETAIL_LEVELS:
+            sizes = [tile["levels"][label]["records"] for tile in tiles.values() if label in tile["levels"]]
+            if sizes:
+                biggest = max(sizes, key=len)
+                print(f"{label:<14}{len(sizes):>10}{len(biggest):>14}{airport_clusters.payload_bytes(biggest) / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_connections.py
+# Build and query time of the connection finder on large synthetic schedules.
+#
+#   python bench_connections.py
+#   python bench_connections.py --airports 500 --legs 200000 --queries 500
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import connections
+
+
+def synthetic_offers(airports, legs, days, seed=0):
+    rng = random.Random(seed)
+    codes = [f"A{i:03d}" for i in range(airports)]
+    # A few hubs carry most of the traffic, like real networks
+    weights = [1 / (rank + 1) for rank in range(airports)]
+    start = datetime(2030, 1, 1)
+    offers = []
+    for _ in range(legs):
+        origin, dest = rng.choices(codes, weights, k=2)
+        if origin == dest:
+            continue
+        departure = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+        arrival = departure + timedelta(minutes=rng.randint(45, 480))
+        offers.append({
+            "price": f"{rng.uniform(39, 999):.2f}",
+            "currency": "USD",
+            "duration": "N/A",
+            "segments": [{
+                "from": origin, "to": dest, "carrier": rng.choice(["AA", "DL", "UA", "WN"]), "aircraft": "320",
+                "departure": departure.isoformat(), "arrival": arrival.isoformat(), "duration": "N/A",
+            }],
+        })
+    return codes, offers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the connection finder on synthetic schedules.")
+    parser.add_argument("--airports", type=int, default=300)
+    parser.add_argument("--legs", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-stops", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=5, help="itineraries per query")
+    args = parser.parse_args()
+
+    codes, offers = synthetic_offers(args.airports, args.legs, args.days)
+    start = time.perf_counter()
+    graph = connections.RouteGraph(offers)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(graph.legs)} legs across {args.airports} airports, graph built in {build_ms:.1f} ms")
+
+    rng = random.Random(1)
+    pairs = [tuple(rng.sample(codes, 2)) for _ in range(args.queries)]
+    print(f"{'criterion':<16}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}{'found':>8}")
+    for label, criterion in connections.CRITERIA.items():
+        timings, found = [], 0
+        for origin, dest in pairs:
+            start = time.perf_counter()
+            results = graph.find(origin, dest, criterion, max_stops=args.max_stops, limit=args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            found += bool(results)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+        print(f"{label:<16}{statistics.mean(timings):>10.2f}{p95:>10.2f}{timings[-1]:>10.2f}{found:>5}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# benchmark.py
+# Offline end-to-end benchmark: drives each page headlessly against fake_upstreams.py
+# with concurrent simulated sessions and reports rerun latency percentiles and upstream calls.
+#
+#   python benchmark.py
+#   python benchmark.py --sessions 8 --iterations 5 --amadeus-ms 300 --offers 250
+#   python benchmark.py --json runs/today.json --baseline runs/yesterday.json
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_upstreams import FakeUpstreams
+
+BENCH_DB_NAMESPACE = "plane-n-simple-bench"
+ADMIN_UID = "bench-admin"
+RUN_TIMEOUT_SECONDS = 60
+REGRESSION_TOLERANCE = 0.2
+
+
+def _flight_search_page():
+    import flight_search
+    flight_search.main()
+
+
+def _poi_search_page():
+    import poi_search
+    poi_search.main()
+
+
+def _travel_plans_page():
+    import travel_plans
+    travel_plans.main()
+
+
+def _admin_page():
+    import admin_page
+    admin_page.main()
+
+
+def search_flights(at):
+    next(b for b in at.button if b.label.startswith("🔎")).click()
+
+
+def search_pois(at):
+    at.text_input[0].input("Miami")
+    next(b for b in at.button if b.label == "Filter").click()
+
+
+# page name -> (script, interaction that triggers the page's expensive rerun, or None)
+PAGES = {
+    "flight_search": (_flight_search_page, search_flights),
+    "poi_search": (_poi_search_page, search_pois),
+    "travel_plans": (_travel_plans_page, None),
+    "admin_page": (_admin_page, None),
+}
+
+
+def seed_database(fake, users):
+    plan = json.dumps({
+        "flights": [{"from": "MIA", "to": "JFK", "airline": "AA", "aircraft": "321", "departure": "2030-01-01T08:00:00",
+                     "arrival": "2030-01-01T11:00:00", "duration": "PT3H", "price": "199.00 USD"}],
+        "pois": [{"name": "Fake Cafe", "category": "cafe"}],
+    })
+    fake.seed({
+        "users": {
+            f"bench-user-{i}": {"email": f"user{i}@example.com", "full_name": f"Bench User {i}", "phone": "", "admin": False}
+            for i in range(users)
+        } | {ADMIN_UID: {"email": "admin@example.com", "full_name": "Bench Admin", "phone": "", "admin": True}},
+        "travel_plans": {
+            f"bench-user-{i}": {"Weekend": plan, "Conference": plan} for i in range(users)
+        } | {ADMIN_UID: {"Weekend": plan}},
+    })
+
+
+def init_firebase(fake):
+    # firebase_admin talks to FIREBASE_DATABASE_EMULATOR_HOST with emulator credentials
+    os.environ["FIREBASE_DATABASE_EMULATOR_HOST"] = fake.host
+    os.environ["FIREBASE_AUTH_EMULATOR_HOST"] = fake.host
+    import firebase_admin
+    from google.auth.credentials import AnonymousCredentials
+
+    class _BenchCredential(firebase_admin.credentials.Base):
+        def get_credential(self):
+            return AnonymousCredentials()
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(_BenchCredential(), {
+            "databaseURL": f"https://{BENCH_DB_NAMESPACE}.firebaseio.com",
+            "projectId": BENCH_DB_NAMESPACE,
+        })
+
+
+def run_session(page, session, iterations, fake):
+    from streamlit.testing.v1 import AppTest
+
+    script, interaction = PAGES[page]
+    timings = []
+    for _ in range(iterations):
+        at = AppTest.from_function(script, default_timeout=RUN_TIMEOUT_SECONDS)
+        at.secrets["amadeus"] = {"client_id": "bench", "client_secret": "bench", "base_url": fake.base_url}
+        at.secrets["geoapify"] = {"api_key": "bench", "base_url": fake.base_url}
+        at.session_state["uid"] = ADMIN_UID if page == "admin_page" else f"bench-user-{session}"
+
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if interaction:
+            interaction(at)
+            start = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"{page} raised: {at.exception[0].value}")
+    return timings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def benchmark_page(page, sessions, iterations, fake):
+    before = fake.call_counts()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = pool.map(lambda session: run_session(page, session, iterations, fake), range(sessions))
+        timings = [t for session_timings in results for t in session_timings]
+    wall = time.perf_counter() - start
+    after = fake.call_counts()
+    calls = {endpoint: count - before.get(endpoint, 0) for endpoint, count in after.items() if count != before.get(endpoint, 0)}
+    return {
+        "reruns": len(timings),
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "reruns_per_s": len(timings) / wall,
+        "upstream_calls": calls,
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"{'page':<16}{'reruns':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'reruns/s':>10}  upstream calls")
+    regressions = []
+    for page, r in results.items():
+        calls = ", ".join(f"{endpoint}={count}" for endpoint, count in sorted(r["upstream_calls"].items()))
+        print(f"{page:<16}{r['reruns']:>8}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['reruns_per_s']:>10.1f}  {calls}")
+        if baseline and page in baseline:
+            for metric in ("p50_ms", "p95_ms"):
+                old, new = baseline[page][metric], r[metric]
+                if old and new > old * (1 + REGRESSION_TOLERANCE):
+                    regressions.append(f"{page} {metric}: {old:.1f} → {new:.1f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end page benchmark against local fake upstreams.")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions per page")
+    parser.add_argument("--iterations", type=int, default=3, help="page loads per session")
+    parser.add_argument("--amadeus-ms", type=float, default=150)
+    parser.add_argument("--geoapify-ms", type=float, default=80)
+    parser.add_argument("--auth-ms", type=float, default=60)
+    parser.add_argument("--rtdb-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--offers", type=int, default=20, help="flight offers per Amadeus response")
+    parser.add_argument("--places", type=int, default=20, help="max POIs per Geoapify response")
+    parser.add_argument("--users", type=int, default=50, help="users seeded into the fake database")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+
+    latency = {"amadeus": args.amadeus_ms, "geoapify": args.geoapify_ms, "auth": args.auth_ms, "rtdb": args.rtdb_ms}
+    with FakeUpstreams(latency_ms=latency, jitter_ms=args.jitter_ms, offers=args.offers, places=args.places) as fake:
+        seed_database(fake, max(args.users, args.sessions))
+        init_firebase(fake)
+        results = {page: benchmark_page(page, args.sessions, args.iterations, fake) for page in args.pages}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"timestamp": time.time(), "args": vars(args), "results": results}, f, indent=2)
+
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
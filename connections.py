@@ -0,0 +1,142 @@
+# connections.py
+# One- and two-stop connection finder over flight offers we already have.
+#
+# Every cached offer (see amadeus_client.compact_offer) becomes a timed leg from its first
+# departure to its last arrival. Legs are indexed by departure airport and time, so the
+# onward connections from a leg are a bisect away, and a best-first search assembles
+# itineraries in order of price, total duration or arrival time without any new API calls.
+#
+# Amadeus times are local to each airport. Connection checks compare two times at the same
+# airport, so they are exact; durations across time zones are local-clock approximations.
+import bisect
+import heapq
+from datetime import datetime, timedelta
+
+CRITERIA = {
+    "Price": "price",
+    "Total Duration": "duration",
+    "Arrival Time": "arrival",
+}
+
+DEFAULT_MIN_CONNECTION_MINUTES = 45
+DEFAULT_MAX_LAYOVER_MINUTES = 12 * 60
+
+EPOCH = datetime(2000, 1, 1)
+
+
+def to_minutes(timestamp):
+    return (datetime.fromisoformat(timestamp) - EPOCH) // timedelta(minutes=1)
+
+
+class Leg:
+    __slots__ = ("origin", "dest", "departure", "arrival", "price", "stops", "offer")
+
+    def __init__(self, offer):
+        segments = offer["segments"]
+        self.origin = segments[0]["from"]
+        self.dest = segments[-1]["to"]
+        self.departure = to_minutes(segments[0]["departure"])
+        self.arrival = to_minutes(segments[-1]["arrival"])
+        self.price = float(offer["price"])
+        self.stops = len(segments) - 1
+        self.offer = offer
+
+
+class RouteGraph:
+    def __init__(self, offers, min_connection_minutes=DEFAULT_MIN_CONNECTION_MINUTES, max_layover_minutes=DEFAULT_MAX_LAYOVER_MINUTES):
+        self.min_connection = min_connection_minutes
+        self.max_layover = max_layover_minutes
+
+        # Same flight cached by two searches: keep one leg per (route, times, carriers)
+        unique = {}
+        for offer in offers:
+            key = tuple((s["from"], s["to"], s["departure"], s["carrier"]) for s in offer["segments"])
+            if key not in unique or float(offer["price"]) < float(unique[key]["price"]):
+                unique[key] = offer
+        self.legs = [Leg(offer) for offer in unique.values()]
+
+        # airport -> (departure times, leg indices), both sorted by departure time
+        by_airport = {}
+        self.inbound = {}
+        for i, leg in enumerate(self.legs):
+            by_airport.setdefault(leg.origin, []).append((leg.departure, i))
+            self.inbound.setdefault(leg.dest, set()).add(leg.origin)
+        self.departures = {}
+        for airport, entries in by_airport.items():
+            entries.sort()
+            self.departures[airport] = ([t for t, _ in entries], [i for _, i in entries])
+
+    def connections_from(self, leg):
+        times, indices = self.departures.get(leg.dest, ((), ()))
+        start = bisect.bisect_left(times, leg.arrival + self.min_connection)
+        end = bisect.bisect_right(times, leg.arrival + self.max_layover)
+        return indices[start:end]
+
+    def cost(self, path, criterion):
+        first, last = self.legs[path[0]], self.legs[path[-1]]
+        if criterion == "price":
+            return sum(self.legs[i].price for i in path)
+        elif criterion == "duration":
+            return last.arrival - first.departure
+        return last.arrival
+
+    def reachable(self, dest, max_legs):
+        # reach[k] = airports that can get to dest in at most k more legs (reach[0] = {dest})
+        reach = [{dest}]
+        for _ in range(max_legs):
+            frontier = set(reach[-1])
+            for airport in reach[-1]:
+                frontier |= self.inbound.get(airport, set())
+            reach.append(frontier)
+        return reach
+
+    def find(self, origin, dest, criterion="price", max_stops=2, limit=5):
+        # Best-first search; every criterion only grows as legs are added, so itineraries
+        # come off the heap in cost order. Each leg is expanded at most `limit` times, and
+        # legs that cannot reach dest within the remaining stops are never pushed.
+        reach = self.reachable(dest, max_stops + 1)
+        heap = []
+        counter = 0
+        for i in self.departures.get(origin, ((), ()))[1]:
+            if self.legs[i].stops <= max_stops and self.legs[i].dest in reach[max_stops - self.legs[i].stops]:
+                heapq.heappush(heap, (self.cost((i,), criterion), counter, (i,)))
+                counter += 1
+
+        expanded = {}
+        results = []
+        while heap and len(results) < limit:
+            cost, _, path = heapq.heappop(heap)
+            leg = self.legs[path[-1]]
+            if leg.dest == dest:
+                results.append(self.itinerary(path, cost))
+                continue
+
+            if expanded.get(path[-1], 0) >= limit:
+                continue
+            expanded[path[-1]] = expanded.get(path[-1], 0) + 1
+
+            stops = sum(self.legs[i].stops for i in path) + len(path) - 1
+            visited = {origin} | {self.legs[i].dest for i in path}
+            for j in self.connections_from(leg):
+                nxt = self.legs[j]
+                remaining = max_stops - stops - 1 - nxt.stops
+                if remaining < 0 or nxt.dest in visited or nxt.dest not in reach[remaining]:
+                    continue
+                new_path = path + (j,)
+                heapq.heappush(heap, (self.cost(new_path, criterion), counter, new_path))
+                counter += 1
+        return results
+
+    def itinerary(self, path, cost):
+        legs = [self.legs[i] for i in path]
+        return {
+            "offers": [leg.offer for leg in legs],
+            "route": [legs[0].origin] + [leg.dest for leg in legs],
+            "price": round(sum(leg.price for leg in legs), 2),
+            "currency": legs[0].offer["currency"],
+            "departure": legs[0].offer["segments"][0]["departure"],
+            "arrival": legs[-1].offer["segments"][-1]["arrival"],
+            "duration_minutes": legs[-1].arrival - legs[0].departure,
+            "stops": sum(leg.stops for leg in legs) + len(legs) - 1,
+            "cost": cost,
+        }
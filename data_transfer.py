@@ -0,0 +1,177 @@
+# data_transfer.py
+# Streaming bulk export/import of users and travel plans as gzip-compressed JSON Lines.
+#
+# Export pages through `users` and `travel_plans` with order_by_key() cursors, so only one
+# page of records is ever in memory. Import writes batches with one multi-path update each
+# and records a checkpoint after every batch, so an interrupted import resumes where it stopped.
+#
+# From the admin dashboard, or from the command line with .streamlit/secrets.toml:
+#   python data_transfer.py export backup.jsonl.gz
+#   python data_transfer.py import backup.jsonl.gz
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from firebase_admin import db
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_children(path, page_size=DEFAULT_PAGE_SIZE):
+    # Yields (key, value) for every child of `path` in key order, one page per request
+    cursor = None
+    while True:
+        query = db.reference(path).order_by_key()
+        if cursor is not None:
+            query = query.start_at(cursor)
+        page = query.limit_to_first(page_size + (cursor is not None)).get() or {}
+        items = [(key, value) for key, value in page.items() if key != cursor]
+        yield from items
+        if len(page) < page_size + (cursor is not None) or not items:
+            return
+        cursor = items[-1][0]
+
+
+def iter_records(page_size=DEFAULT_PAGE_SIZE):
+    for uid, data in iter_children("users", page_size):
+        yield {"kind": "user", "uid": uid, "data": data}
+    for uid, plans in iter_children("travel_plans", page_size):
+        for plan_name, plan in (plans or {}).items():
+            # Plans are stored as JSON strings; export them decoded
+            yield {"kind": "travel_plan", "uid": uid, "plan": plan_name, "data": json.loads(plan) if isinstance(plan, str) else plan}
+
+
+def export_jsonl(fileobj, page_size=DEFAULT_PAGE_SIZE, progress=None):
+    start = time.perf_counter()
+    counts = {"user": 0, "travel_plan": 0}
+    with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+        writer = io.TextIOWrapper(gz, encoding="utf-8")
+        for record in iter_records(page_size):
+            writer.write(json.dumps(record, separators=(",", ":")) + "\n")
+            counts[record["kind"]] += 1
+            if progress and sum(counts.values()) % page_size == 0:
+                progress(sum(counts.values()))
+        writer.flush()
+        writer.detach()
+    return _stats(counts, start)
+
+
+def record_update(record):
+    if record["kind"] == "user":
+        return f"users/{record['uid']}", record["data"]
+    elif record["kind"] == "travel_plan":
+        return f"travel_plans/{record['uid']}/{record['plan']}", json.dumps(record["data"])
+    raise ValueError(f"Unknown record kind: {record['kind']}")
+
+
+def read_checkpoint(checkpoint_path, source_id):
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        return checkpoint["line"] if checkpoint.get("source") == source_id else 0
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def write_checkpoint(checkpoint_path, source_id, line):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source": source_id, "line": line}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def import_jsonl(fileobj, checkpoint_path, source_id, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    # Lines up to the checkpoint were already written by an earlier run and are skipped
+    start = time.perf_counter()
+    resume_from = read_checkpoint(checkpoint_path, source_id)
+    counts = {"user": 0, "travel_plan": 0}
+    batch = {}
+    line_no = 0
+
+    def flush():
+        if batch:
+            db.reference("/").update(batch)
+            batch.clear()
+        write_checkpoint(checkpoint_path, source_id, line_no)
+        if progress:
+            progress(line_no)
+
+    with gzip.open(fileobj, "rt", encoding="utf-8") as lines:
+        for line_no, line in enumerate(lines, start=1):
+            if line_no <= resume_from or not line.strip():
+                continue
+            record = json.loads(line)
+            path, value = record_update(record)
+            batch[path] = value
+            counts[record["kind"]] += 1
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+    os.remove(checkpoint_path)
+
+    stats = _stats(counts, start)
+    stats["resumed_from_line"] = resume_from
+    return stats
+
+
+def file_fingerprint(path_or_bytes):
+    digest = hashlib.sha256()
+    if isinstance(path_or_bytes, (bytes, bytearray)):
+        digest.update(path_or_bytes)
+    else:
+        with open(path_or_bytes, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _stats(counts, start):
+    seconds = time.perf_counter() - start
+    total = sum(counts.values())
+    return {
+        "users": counts["user"],
+        "travel_plans": counts["travel_plan"],
+        "records": total,
+        "seconds": round(seconds, 2),
+        "records_per_second": round(total / seconds, 1) if seconds else 0.0,
+    }
+
+
+def _init_firebase_from_secrets(secrets_path):
+    import toml
+    import firebase_admin
+    from firebase_admin import credentials
+
+    config = toml.load(secrets_path)["firebase"]
+    fields = ["type", "project_id", "private_key_id", "private_key", "client_email", "auth_uri",
+              "token_uri", "auth_provider_x509_cert_url", "client_x509_cert_url"]
+    cred = credentials.Certificate({field: config[field] for field in fields})
+    firebase_admin.initialize_app(cred, {"databaseURL": config["databaseURL"]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import users and travel plans as .jsonl.gz")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    _init_firebase_from_secrets(args.secrets)
+    report = lambda n: print(f"  {n} records", end="\r", flush=True)
+    if args.command == "export":
+        with open(args.path, "wb") as f:
+            stats = export_jsonl(f, args.page_size, progress=report)
+    else:
+        with open(args.path, "rb") as f:
+            stats = import_jsonl(f, f"{args.path}.checkpoint", file_fingerprint(args.path), args.batch_size, progress=report)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# fake_upstreams.py
+# Local stand-ins for Amadeus, Geoapify, Firebase Auth and the Firebase Realtime Database,
+# used by benchmark.py to exercise the pages offline.
+#
+# One threaded HTTP server answers for all four services:
+#   Amadeus   POST /v1/security/oauth2/token, GET /v2/shopping/flight-offers
+#   Geoapify  GET  /v1/geocode/search, GET /v2/places
+#   Auth      POST /identitytoolkit.googleapis.com/v1/accounts:*   (FIREBASE_AUTH_EMULATOR_HOST)
+#   RTDB      GET/PUT/PATCH/POST/DELETE /<path>.json                (FIREBASE_DATABASE_EMULATOR_HOST)
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HUBS = ["ATL", "DFW", "DEN", "ORD", "LAX", "JFK", "MIA", "SEA"]
+CARRIERS = ["AA", "DL", "UA", "B6", "WN", "NK", "AS", "F9"]
+POI_CATEGORIES = ["catering.restaurant", "catering.cafe", "entertainment.cinema", "tourism.sights", "accommodation.hotel", "leisure.park", "commercial.shopping_mall"]
+
+
+class FakeUpstreams:
+    def __init__(self, latency_ms=None, jitter_ms=0, offers=20, places=20, host="127.0.0.1", port=0):
+        # latency_ms: {"amadeus": 120, "geoapify": 80, "auth": 50, "rtdb": 20}
+        self.latency_ms = {"amadeus": 0, "geoapify": 0, "auth": 0, "rtdb": 0, **(latency_ms or {})}
+        self.jitter_ms = jitter_ms
+        self.offers = offers
+        self.places = places
+        self.calls = Counter()
+        self.db = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return f"{self._server.server_address[0]}:{self._server.server_address[1]}"
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def call_counts(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def record(self, service, endpoint):
+        with self._lock:
+            self.calls[f"{service} {endpoint}"] += 1
+
+    def delay(self, service):
+        base = self.latency_ms.get(service, 0)
+        if base or self.jitter_ms:
+            time.sleep(max(0, base + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+    # ---- Realtime Database tree ----
+
+    def db_get(self, path):
+        with self._lock:
+            node = self.db
+            for part in path:
+                if not isinstance(node, dict) or part not in node:
+                    return None
+                node = node[part]
+            return json.loads(json.dumps(node))
+
+    def db_set(self, path, value):
+        with self._lock:
+            if not path:
+                self.db = value if isinstance(value, dict) else {}
+                return
+            node = self.db
+            for part in path[:-1]:
+                node = node.setdefault(part, {})
+            if value is None:
+                node.pop(path[-1], None)
+            else:
+                node[path[-1]] = value
+
+    def seed(self, tree):
+        for key, value in tree.items():
+            self.db_set([key], value)
+
+
+def split_path(path):
+    return [part for part in path.strip("/").split("/") if part]
+
+
+def apply_query(value, query):
+    # Subset of the RTDB REST query language: shallow and orderBy="$key" ranges
+    if not isinstance(value, dict):
+        return value
+    if query.get("shallow", [""])[0] == "true":
+        return {key: True for key in value}
+    if "orderBy" in query:
+        keys = sorted(value)
+        if "startAt" in query:
+            keys = [k for k in keys if k >= json.loads(query["startAt"][0])]
+        if "endAt" in query:
+            keys = [k for k in keys if k <= json.loads(query["endAt"][0])]
+        if "limitToFirst" in query:
+            keys = keys[:int(query["limitToFirst"][0])]
+        if "limitToLast" in query:
+            keys = keys[-int(query["limitToLast"][0]):]
+        return {k: value[k] for k in keys}
+    return value
+
+
+def fake_offers(origin, dest, travel_date, count):
+    rng = random.Random(f"{origin}{dest}{travel_date}")
+    offers = []
+    for i in range(count):
+        carrier = rng.choice(CARRIERS)
+        depart_hour = rng.randint(5, 16)
+        minutes = rng.randint(60, 360)
+        stops = [] if i % 3 else [rng.choice([h for h in HUBS if h not in (origin, dest)])]
+        route = [origin] + stops + [dest]
+        segments, hour = [], depart_hour
+        for leg_from, leg_to in zip(route, route[1:]):
+            leg_minutes = minutes // len(route[1:])
+            arrive = hour * 60 + leg_minutes
+            segments.append({
+                "departure": {"iataCode": leg_from, "at": f"{travel_date}T{hour % 24:02d}:00:00"},
+                "arrival": {"iataCode": leg_to, "at": f"{travel_date}T{(arrive // 60) % 24:02d}:{arrive % 60:02d}:00"},
+                "carrierCode": carrier,
+                "number": str(rng.randint(100, 9999)),
+                "aircraft": {"code": rng.choice(["320", "321", "738", "7M8", "E75"])},
+                "duration": f"PT{leg_minutes // 60}H{leg_minutes % 60}M",
+            })
+            hour = arrive // 60 + 1
+        offers.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "itineraries": [{"duration": f"PT{minutes // 60}H{minutes % 60}M", "segments": segments}],
+            "price": {"currency": "USD", "total": f"{rng.uniform(59, 899):.2f}"},
+        })
+    return offers
+
+
+def fake_places(lon, lat, count):
+    rng = random.Random(f"{lat:.3f}{lon:.3f}")
+    features = []
+    for i in range(count):
+        category = rng.choice(POI_CATEGORIES)
+        p_lat, p_lon = lat + rng.uniform(-0.1, 0.1), lon + rng.uniform(-0.1, 0.1)
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "place_id": f"fake-{lat:.3f}-{lon:.3f}-{i}",
+                "name": f"{category.split('.')[-1].replace('_', ' ').title()} {i}",
+                "categories": [category.split(".")[0], category],
+                "address_line2": f"{i} Fake Street",
+                "lat": p_lat,
+                "lon": p_lon,
+            },
+            "geometry": {"type": "Point", "coordinates": [p_lon, p_lat]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None):
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _route(self, method):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            body = self._body()
+
+            if url.path == "/v1/security/oauth2/token":
+                fake.record("amadeus", "token")
+                fake.delay("amadeus")
+                return self._send(200, {"access_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": 1799})
+            if url.path == "/v2/shopping/flight-offers":
+                fake.record("amadeus", "flight-offers")
+                fake.delay("amadeus")
+                origin = query["originLocationCode"][0]
+                dest = query["destinationLocationCode"][0]
+                return self._send(200, {"data": fake_offers(origin, dest, query["departureDate"][0], fake.offers)})
+            if url.path == "/v1/geocode/search":
+                fake.record("geoapify", "geocode")
+                fake.delay("geoapify")
+                rng = random.Random(query.get("text", [""])[0].lower())
+                lat, lon = rng.uniform(25, 48), rng.uniform(-122, -71)
+                return self._send(200, {"features": [{"properties": {"lat": lat, "lon": lon}}]})
+            if url.path == "/v2/places":
+                fake.record("geoapify", "places")
+                fake.delay("geoapify")
+                _, center = query["filter"][0].split(":", 1)
+                lon, lat, _ = [float(v) for v in center.split(",")]
+                limit = int(query.get("limit", [fake.places])[0])
+                return self._send(200, fake_places(lon, lat, min(limit, fake.places)))
+            if url.path.startswith("/identitytoolkit.googleapis.com/v1/accounts:"):
+                action = url.path.rsplit(":", 1)[1]
+                fake.record("auth", action)
+                fake.delay("auth")
+                payload = json.loads(body or b"{}")
+                return self._send(200, {"localId": f"uid-{payload.get('email', '')}", "email": payload.get("email"), "idToken": uuid.uuid4().hex})
+            if url.path.endswith(".json"):
+                return self._rtdb(method, split_path(url.path[:-len(".json")]), query, body)
+            return self._send(404, {"error": f"no fake for {method} {url.path}"})
+
+        def _rtdb(self, method, path, query, body):
+            fake.record("rtdb", method)
+            fake.delay("rtdb")
+            silent = query.get("print", [""])[0] == "silent"
+            if method == "GET":
+                return self._send(200, apply_query(fake.db_get(path), query))
+            value = json.loads(body) if body else None
+            if method == "PUT":
+                fake.db_set(path, value)
+            elif method == "PATCH":
+                for key, child in value.items():
+                    fake.db_set(path + split_path(key), child)
+            elif method == "POST":
+                key = f"-{uuid.uuid4().hex[:19]}"
+                fake.db_set(path + [key], value)
+                return self._send(200, {"name": key})
+            elif method == "DELETE":
+                fake.db_set(path, None)
+            return self._send(204) if silent else self._send(200, value)
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_PUT(self):
+            self._route("PUT")
+
+        def do_PATCH(self):
+            self._route("PATCH")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+    return Handler
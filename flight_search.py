@@ -1,82 +1,103 @@
 import streamlit as st
-import pandas as pd
-import requests
 from datetime import date
 from firebase_admin import db
 import json
 
-def load_airports():
-    df = pd.read_csv("airports.csv")
-    df = df.dropna(subset=["iata_code"])
-    df["display_name"] = df["iata_code"].str.upper() + " - " + df["name"].str.strip()
-    df = df.drop_duplicates(subset=["display_name"])
-    return df
+import airport_catalog
+import amadeus_client
+import connections
+import price_watch
+import resilience
+import session_cache
 
-def get_amadeus_token():
-    try:
-        client_id = st.secrets["amadeus"]["client_id"]
-        client_secret = st.secrets["amadeus"]["client_secret"]
-    except KeyError as e:
-        st.error(f"🔐 Missing Amadeus credentials: {e}")
-        return None
-
-    url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    payload = {
-        "grant_type": "client_credentials",
-        "client_id": client_id,
-        "client_secret": client_secret
-    }
-
-    try:
-        res = requests.post(url, data=payload)
-        if res.status_code == 200:
-            return res.json()["access_token"]
-        else:
-            st.error(f"❌ Failed to fetch Amadeus token: {res.status_code} - {res.text}")
-            return None
-    except requests.RequestException as e:
-        st.error(f"🚨 Error connecting to Amadeus: {e}")
-        return None
-
-
-def search_amadeus_flights(origin_code, dest_code, travel_date):
-    token = get_amadeus_token()
-    if not token:
-        return []
-
-    url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-    params = {
-        "originLocationCode": origin_code,
-        "destinationLocationCode": dest_code,
-        "departureDate": travel_date.strftime("%Y-%m-%d"),
-        "adults": 1,
-        "currencyCode": "USD",
-        "travelClass": "ECONOMY"
-    }
-
-    res = requests.get(url, headers=headers, params=params)
-
-    if res.status_code == 200:
-        return res.json().get("data", [])
-    else:
-        return []
+MAX_CONNECTIONS = 5
+# End-to-end time budget for one search, including the token request
+SEARCH_DEADLINE_SECONDS = 15
 
 def get_sort_key(option):
     def sort_key(offer):
-        segment = offer["itineraries"][0]["segments"][0]
+        segment = offer["segments"][0]
         if option == "Price: Low to High" or option == "Price: High to Low":
-            return float(offer["price"]["total"])
+            return float(offer["price"])
         elif option.startswith("Departure"):
-            return segment["departure"]["at"]
+            return segment["departure"]
         elif option.startswith("Arrival"):
-            return segment["arrival"]["at"]
+            return segment["arrival"]
         elif option == "Airline Name":
-            return segment.get("carrierCode", "")
+            return segment.get("carrier") or ""
     return sort_key
 
+def filter_offers(flights, origin_code, dest_code, strict_match):
+    if strict_match:
+        # Nonstop only: the first segment must fly the whole route
+        return [
+            offer for offer in flights
+            if offer["segments"][0]["from"] == origin_code and offer["segments"][0]["to"] == dest_code
+        ]
+    return [
+        offer for offer in flights
+        if offer["segments"][0]["from"] == origin_code and offer["segments"][-1]["to"] == dest_code
+    ]
+
+def flight_data(offer):
+    segments = offer["segments"]
+    return {
+        "from": segments[0]["from"],
+        "to": segments[-1]["to"],
+        "airline": segments[0]["carrier"],
+        "aircraft": segments[0]["aircraft"],
+        "departure": segments[0]["departure"],
+        "arrival": segments[-1]["arrival"],
+        "duration": offer["duration"],
+        "price": offer["price"] + " " + offer["currency"]
+    }
+
+def add_to_plan(uid, plan_name, offers, watch=False):
+    plan_ref = db.reference(f"travel_plans/{uid}/{plan_name}")
+    current_plan = json.loads(plan_ref.get())
+    for offer in offers:
+        flight = flight_data(offer)
+        if watch:
+            flight["watch"] = price_watch.watch_flight(uid, plan_name, flight)
+        current_plan.get("flights").append(flight)
+    plan_ref.set(json.dumps(current_plan))
+
+def show_connections(uid, plan_names, origin_code, dest_code):
+    # Multi-leg suggestions assembled from every offer this session has already fetched
+    st.markdown(f"### 🔗 Suggested Connections to *{dest_code}*")
+    criterion = st.selectbox("Connect By", list(connections.CRITERIA))
+
+    cached_offers = [offer for _, offers in session_cache.entries("flights") for offer in offers]
+    graph = connections.RouteGraph(cached_offers)
+    itineraries = graph.find(origin_code, dest_code, connections.CRITERIA[criterion], max_stops=2, limit=MAX_CONNECTIONS * 3)
+    itineraries = [itinerary for itinerary in itineraries if len(itinerary["offers"]) > 1][:MAX_CONNECTIONS]
+
+    if not itineraries:
+        st.info("ℹ️ No connections found in your recent searches yet. Search a leg like "
+                f"{origin_code} → a hub, then the hub → {dest_code}, to build one.")
+        return
+
+    for idx, itinerary in enumerate(itineraries):
+        hours, minutes = divmod(itinerary["duration_minutes"], 60)
+        stops = "1 stop" if itinerary["stops"] == 1 else f"{itinerary['stops']} stops"
+        with st.container(border=True):
+            st.markdown(f"<span style=\"font-size: 24px\">🛫 {' → '.join(itinerary['route'])}</span>", unsafe_allow_html=True)
+            st.markdown(f"Departure: {itinerary['departure']}  ")
+            st.markdown(f"Arrival: {itinerary['arrival']}  ")
+            st.markdown(f"Duration: {hours}h {minutes}m ({stops})  ")
+            st.markdown(f"💲Price: {itinerary['price']:.2f} {itinerary['currency']}")
+            for offer in itinerary["offers"]:
+                segments = offer["segments"]
+                st.markdown(f"- {segments[0]['from']} → {segments[-1]['to']} {segments[0]['carrier']} "
+                            f"{segments[0]['departure']} → {segments[-1]['arrival']} ({offer['price']} {offer['currency']})")
+
+            with st.expander("➕ Add to Travel Plan"):
+                selected_plan = st.selectbox("Select a Plan", plan_names, key=f"connection_plan_select_{idx}")
+                watch = st.checkbox("🔔 Watch Prices", key=f"connection_watch_{idx}")
+                if st.button("Add All Legs to Plan", key=f"connection_add_btn_{idx}"):
+                    add_to_plan(uid, selected_plan, itinerary["offers"], watch)
+                    st.success(f"Connection added to '{selected_plan}'!")
+
 def main():
     st.title("✈️ Plane N Simple: Flight Search")
     st.markdown("Search and compare real-time flights via Amadeus API")
@@ -86,7 +107,7 @@ def main():
     plan_names = list(travel_plans.keys())
 
     try:
-        airports_df = load_airports()
+        airports_df = airport_catalog.load_airports()
     except Exception as e:
         st.error("⚠️ Failed to load airports.csv")
         st.exception(e)
@@ -106,84 +127,57 @@ def main():
         strict_match = st.checkbox("Enable Strict Match", value=True)
 
         if st.button("🔎 Search Flights", use_container_width=True):
-            origin_row = airports_df[airports_df["display_name"] == origin_display].iloc[0]
-            origin_code = origin_row["iata_code"]
-            if origin_code == "MIA":
-                dest_code = "JFK" if not strict_match else airports_df[airports_df["display_name"] == destination_display].iloc[0]["iata_code"]
-            else:
-                dest_code = "MIA" if not strict_match else airports_df[airports_df["display_name"] == destination_display].iloc[0]["iata_code"]
-
-            flights = search_amadeus_flights(origin_code, dest_code, travel_date)
-
-            if not flights:
-                st.warning("⚠️ No flights found for the selected route and date. Please try a different departure, destination, or travel date.")
-                return
-
-            if strict_match:
-                flights = [
-                    offer for offer in flights
-                    if offer["itineraries"][0]["segments"][0]["departure"]["iataCode"] == origin_code and
-                       offer["itineraries"][0]["segments"][0]["arrival"]["iataCode"] == dest_code
-                ]
-            else:
-                flights = [
-                    offer for offer in flights
-                    if offer["itineraries"][0]["segments"][0]["departure"]["iataCode"] == origin_code
-                ]
-
-            if not flights:
-                st.warning("⚠️ No matching flights found based on your selection.")
-                return
-
-            st.session_state.flights = flights
-            st.session_state.origin_code = origin_code
-            st.session_state.dest_code = dest_code
-            st.session_state.travel_date = travel_date
-
-    if "flights" in st.session_state:
-        flights = st.session_state.flights
-        origin_code = st.session_state.origin_code
-        dest_code = st.session_state.dest_code
-        travel_date = st.session_state.travel_date
+            origin_code = airports_df[airports_df["display_name"] == origin_display].iloc[0]["iata_code"]
+            dest_code = airports_df[airports_df["display_name"] == destination_display].iloc[0]["iata_code"]
+
+            with resilience.action(SEARCH_DEADLINE_SECONDS) as current:
+                flights = [amadeus_client.compact_offer(offer) for offer in amadeus_client.search_amadeus_flights(origin_code, dest_code, travel_date)]
+
+            # Everything fetched is cached, unfiltered, so later searches can reuse it for connections
+            if flights or not current.errors:
+                search_key = (origin_code, dest_code, travel_date.isoformat())
+                session_cache.put("flights", search_key, flights, meta={"stale": current.stale_times()})
+                st.session_state.flight_search = search_key
+
+    flights = session_cache.get("flights", st.session_state.get("flight_search"))
+    if flights is not None:
+        origin_code, dest_code, travel_date = st.session_state.flight_search
+        travel_date = date.fromisoformat(travel_date)
 
         st.markdown(f"### ✈️ Results for {travel_date.strftime('%b %d, %Y')} from *{origin_code}*")
+        stale = (session_cache.get_meta("flights", st.session_state.flight_search) or {}).get("stale")
+        if stale:
+            st.warning(f"🕒 Amadeus is slow or unavailable, so these are saved results from {stale['amadeus']}. Prices may have changed.")
+
+        flights = filter_offers(flights, origin_code, dest_code, strict_match)
+        if not flights:
+            st.warning("⚠️ No flights found for the selected route and date. Please try a different departure, destination, or travel date.")
 
         if sort_option != "Select":
             reverse = sort_option in ["Price: High to Low", "Departure: Latest", "Arrival: Latest"]
-            flights.sort(key=get_sort_key(sort_option), reverse=reverse)
+            flights = sorted(flights, key=get_sort_key(sort_option), reverse=reverse)
 
         for idx, offer in enumerate(flights):
-            segment = offer["itineraries"][0]["segments"][0]
-            departure = segment["departure"]
-            arrival = segment["arrival"]
-            summary = f"<span style=\"font-size: 24px\">🛫 {departure['iataCode']} → 🛬 {arrival['iataCode']} ({segment.get('carrierCode')} | {segment.get('aircraft', {}).get('code', 'N/A')})</span>"
+            segments = offer["segments"]
+            route = " → ".join([segments[0]["from"]] + [segment["to"] for segment in segments[:-1]])
+            summary = f"<span style=\"font-size: 24px\">🛫 {route} → 🛬 {segments[-1]['to']} ({segments[0]['carrier']} | {segments[0]['aircraft']})</span>"
 
             with st.container(border=True):
                 st.markdown(f"**{summary}**", unsafe_allow_html=True)
-                st.markdown(f"Departure: {departure['at']}  ")
-                st.markdown(f"Arrival: {arrival['at']}  ")
-                st.markdown(f"Duration: {segment.get('duration', 'N/A')}  ")
-                st.markdown(f"💲Price: {offer['price']['total']} {offer['price']['currency']}")
+                st.markdown(f"Departure: {segments[0]['departure']}  ")
+                st.markdown(f"Arrival: {segments[-1]['arrival']}  ")
+                st.markdown(f"Duration: {offer['duration']}  ")
+                st.markdown(f"💲Price: {offer['price']} {offer['currency']}")
 
                 with st.expander("➕ Add to Travel Plan"):
                     selected_plan = st.selectbox("Select a Plan", plan_names, key=f"plan_select_{idx}")
+                    watch = st.checkbox("🔔 Watch Price", key=f"watch_{idx}")
                     if st.button("Add to Plan", key=f"add_btn_{idx}"):
-                        flight_data = {
-                            "from": departure["iataCode"],
-                            "to": arrival["iataCode"],
-                            "airline": segment.get("carrierCode"),
-                            "aircraft": segment.get("aircraft", {}).get("code", "N/A"),
-                            "departure": departure["at"],
-                            "arrival": arrival["at"],
-                            "duration": segment.get("duration", "N/A"),
-                            "price": offer["price"]["total"] + " " + offer["price"]["currency"]
-                        }
-
-                        plan_ref = db.reference(f"travel_plans/{uid}/{selected_plan}")
-                        current_plan = json.loads(plan_ref.get())
-                        current_plan.get("flights").append(flight_data)
-                        plan_ref.set(json.dumps(current_plan))
+                        add_to_plan(uid, selected_plan, [offer], watch)
                         st.success(f"Flight added to '{selected_plan}'!")
 
+        if not strict_match:
+            show_connections(uid, plan_names, origin_code, dest_code)
+
 if __name__ == "__main__":
     main()
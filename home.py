@@ -3,6 +3,65 @@ import os
 import pandas as pd
 import pydeck as pdk
 
+import airport_clusters
+import metrics
+
+# Largest number of map points we are happy to ship to the browser by default
+DEFAULT_MAX_MAP_POINTS = 2000
+
+class SerializedDeck(pdk.Deck):
+    # st.pydeck_chart calls to_json() on every rerun; these decks never change, so the JSON is
+    # built on first render and reused by every later rerun and session in the process
+    def to_json(self):
+        if getattr(self, "_cached_json", None) is None:
+            self._cached_json = super().to_json()
+        return self._cached_json
+
+TOOLTIP = {
+    "html": "{label}",
+    "style": {"backgroundColor": "white", "color": "#404040", "border-radius": "10px", "padding": "10px 15px"},
+}
+
+def build_decks(levels, latitude, longitude, zoom=None):
+    # One deck per detail level, plus the finest level that fits DEFAULT_MAX_MAP_POINTS
+    # (or the coarsest level when none does)
+    decks = {}
+    for label, level in levels.items():
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            data=level["records"],
+            get_position=["longitude", "latitude"],
+            get_color=[255, 0, 0, 150],
+            get_radius="radius",
+            pickable=True,
+        )
+        decks[label] = SerializedDeck(
+            map_style="mapbox://styles/mapbox/light-v9",
+            initial_view_state=pdk.ViewState(
+                latitude=latitude,
+                longitude=longitude,
+                zoom=level["zoom"] if zoom is None else max(zoom, level["zoom"]),
+                pitch=0,
+            ),
+            layers=[layer],
+            tooltip=TOOLTIP,
+        )
+    fitting = [label for label, level in levels.items() if len(level["records"]) <= DEFAULT_MAX_MAP_POINTS]
+    return {"decks": decks, "default": fitting[-1] if fitting else next(iter(levels))}
+
+@st.cache_resource
+def load_airport_map(csv_file="airports.csv"):
+    # Built once per process; every rerun and every session reuses the same layer data.
+    # Large catalogs also get per-region tiles carrying the metro and airport levels.
+    with metrics.timed("csv.airport_map"):
+        df = pd.read_csv(csv_file).dropna(subset=["latitude", "longitude"])
+    world = build_decks(airport_clusters.build_detail_levels(df), df["latitude"].mean(), df["longitude"].mean())
+    regions = {}
+    for label, tile in airport_clusters.build_tiles(df).items():
+        regions[label] = build_decks(tile["levels"], tile["latitude"], tile["longitude"], airport_clusters.tile_zoom(tile["bounds"]))
+        regions[label]["count"] = tile["count"]
+    return world, regions, len(df)
+
 def main():
     # Use image from web_images directory
     image_path = os.path.join("web_images", "home_banner.jpg")
@@ -41,39 +100,22 @@ def main():
     """)
 
     try:
-        csv_file = "airports.csv"
-        df = pd.read_csv(csv_file)
+        world, regions, airport_count = load_airport_map()
 
         with st.expander("📍 All Airlines Supported by Us!"):
-            st.write("Hover over a point to see the airport name.")
-
-            layer = pdk.Layer(
-                "ScatterplotLayer",
-                data=df,
-                get_position=["longitude", "latitude"],
-                get_color=[255, 0, 0, 150],
-                get_radius=20000,
-                pickable=True,
-            )
-
-            tooltip = {
-                "html": "<b>{name}</b><br/><b>{iata_code}</b><br/><b>{latitude}, {longitude}</b>",
-                "style": {"backgroundColor": "white", "color": "#404040", "border-radius": "10px", "padding": "10px 15px"},
-            }
-
-            map = pdk.Deck(
-                map_style="mapbox://styles/mapbox/light-v9",
-                initial_view_state=pdk.ViewState(
-                    latitude=df["latitude"].mean(),
-                    longitude=df["longitude"].mean(),
-                    zoom=3,
-                    pitch=0,
-                ),
-                layers=[layer],
-                tooltip=tooltip,
-            )
-
-            st.pydeck_chart(map)
+            st.write(f"Showing {airport_count} airports. Pick a detail level, then hover over a point to see the airports it covers.")
+
+            region = "Whole World"
+            if regions:
+                region = st.selectbox(
+                    "Region",
+                    ["Whole World"] + list(regions),
+                    format_func=lambda label: label if label == "Whole World" else f"{label} ({regions[label]['count']} airports)",
+                    help="Pick a region to see metro areas and individual airports.",
+                )
+            view = regions.get(region, world)
+            detail = st.select_slider("Map detail", options=list(view["decks"]), value=view["default"], key=f"map_detail_{region}")
+            st.pydeck_chart(view["decks"][detail])
 
     except Exception as e:
         st.warning(f"⚠️ Unable to load airport map: {e}")
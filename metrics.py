@@ -0,0 +1,179 @@
+# metrics.py
+# In-process latency histograms for outbound calls and page renders.
+#
+# Every endpoint gets a fixed set of buckets, so memory stays bounded no matter how
+# long the process runs, and recording is a perf_counter pair, a bisect and a lock.
+import bisect
+import threading
+import time
+import requests
+
+# Bucket upper bounds in seconds (Prometheus "le" labels); the last bucket is +Inf
+BUCKETS = [
+    0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.025, 0.035, 0.05, 0.075, 0.1, 0.15, 0.2,
+    0.3, 0.4, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0,
+]
+
+# Streamlit uses exceptions for st.rerun() and st.stop(); those are not failures
+CONTROL_FLOW_EXCEPTIONS = {"RerunException", "StopException"}
+
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count", "errors")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def percentile(self, pct):
+        # Linear interpolation inside the bucket holding the requested rank
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+def observe(endpoint, seconds, error=False):
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(endpoint)
+        if histogram is None:
+            histogram = _histograms[endpoint] = Histogram()
+        histogram.counts[index] += 1
+        histogram.total += seconds
+        histogram.count += 1
+        if error:
+            histogram.errors += 1
+
+
+class timed:
+    # with metrics.timed("csv.airports"): ...
+    __slots__ = ("endpoint", "start")
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = exc_type is not None and exc_type.__name__ not in CONTROL_FLOW_EXCEPTIONS
+        observe(self.endpoint, time.perf_counter() - self.start, error)
+        return False
+
+
+def request(endpoint, method, url, **kwargs):
+    # requests.request with timing; HTTP 4xx/5xx and connection failures count as errors
+    start = time.perf_counter()
+    try:
+        res = requests.request(method, url, **kwargs)
+    except requests.RequestException:
+        observe(endpoint, time.perf_counter() - start, error=True)
+        raise
+    observe(endpoint, time.perf_counter() - start, error=res.status_code >= 400)
+    return res
+
+
+def percentile(endpoint, pct, min_samples=1):
+    # None until the endpoint has at least `min_samples` observations
+    with _lock:
+        histogram = _histograms.get(endpoint)
+        if histogram is None or histogram.count < min_samples:
+            return None
+        return histogram.percentile(pct)
+
+
+def instrument_firebase():
+    # Wrap the Realtime Database Reference methods, and Query.get for ordered/ranged reads,
+    # once so every read and write is timed, labelled by operation and top-level node
+    # (users, travel_plans, ...)
+    from firebase_admin import db
+
+    if getattr(db.Reference, "_timed", False):
+        return
+
+    def wrap(op):
+        original = getattr(db.Reference, op)
+
+        def timed_op(self, *args, **kwargs):
+            node = self.path.strip("/").split("/")[0] or "root"
+            with timed(f"firebase.{op}.{node}"):
+                return original(self, *args, **kwargs)
+
+        timed_op.__name__ = op
+        timed_op.__doc__ = original.__doc__
+        setattr(db.Reference, op, timed_op)
+
+    for op in ("get", "set", "update", "push", "delete", "transaction"):
+        wrap(op)
+    db.Reference._timed = True
+
+    # Queries only know their URL path, e.g. "/travel_plans/uid.json"
+    query_get = db.Query.get
+
+    def timed_query_get(self, *args, **kwargs):
+        node = self._pathurl.strip("/").split("/")[0].removesuffix(".json") or "root"
+        with timed(f"firebase.query.{node}"):
+            return query_get(self, *args, **kwargs)
+
+    timed_query_get.__name__ = "get"
+    timed_query_get.__doc__ = query_get.__doc__
+    db.Query.get = timed_query_get
+
+
+def snapshot():
+    with _lock:
+        rows = []
+        for endpoint, h in sorted(_histograms.items()):
+            rows.append({
+                "endpoint": endpoint,
+                "calls": h.count,
+                "errors": h.errors,
+                "error_rate": h.errors / h.count if h.count else 0.0,
+                "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+                "p50_ms": h.percentile(50) * 1000,
+                "p95_ms": h.percentile(95) * 1000,
+                "p99_ms": h.percentile(99) * 1000,
+            })
+        return rows
+
+
+def prometheus_text(prefix="plane_n_simple"):
+    lines = [
+        f"# HELP {prefix}_latency_seconds Latency of outbound calls and page renders.",
+        f"# TYPE {prefix}_latency_seconds histogram",
+    ]
+    errors = [
+        f"# HELP {prefix}_errors_total Failed outbound calls and page renders.",
+        f"# TYPE {prefix}_errors_total counter",
+    ]
+    with _lock:
+        for endpoint, h in sorted(_histograms.items()):
+            label = endpoint.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, h.counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_latency_seconds_bucket{{endpoint="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_latency_seconds_bucket{{endpoint="{label}",le="+Inf"}} {h.count}')
+            lines.append(f'{prefix}_latency_seconds_sum{{endpoint="{label}"}} {h.total:.6f}')
+            lines.append(f'{prefix}_latency_seconds_count{{endpoint="{label}"}} {h.count}')
+            errors.append(f'{prefix}_errors_total{{endpoint="{label}"}} {h.errors}')
+    return "\n".join(lines + errors) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
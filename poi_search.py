@@ -1,18 +1,53 @@
 import streamlit as st
-import requests
-import math
+import numpy as np
+import pandas as pd
 import pydeck as pdk
 from firebase_admin import db
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import airport_catalog
+import metrics
+import resilience
+import session_cache
+
+GEOAPIFY_BASE_URL = "https://api.geoapify.com"
+EARTH_RADIUS_MILES = 3958.8
+DUPLICATE_RADIUS_METERS = 30
+POIS_PER_PAGE = 25
+POI_COLUMNS = ["place_id", "name", "category", "address", "lat", "lon"]
+# Geoapify's free tier allows 5 requests/second
+MAX_CONCURRENT_FETCHES = 5
+# End-to-end time budget for one search (geocoding plus places, or every destination of a plan)
+SEARCH_DEADLINE_SECONDS = 10
+MAP_COLORS = [[0, 100, 255, 160], [255, 99, 71, 160], [46, 139, 87, 160], [255, 165, 0, 160], [148, 0, 211, 160], [0, 139, 139, 160]]
+
+def geoapify_base_url():
+    # secrets.toml may point [geoapify] base_url at another host, e.g. the local benchmark fakes
+    try:
+        return st.secrets["geoapify"].get("base_url", GEOAPIFY_BASE_URL)
+    except Exception:
+        return GEOAPIFY_BASE_URL
 
 def get_city_coordinates(city, api_key):
+    url = f"{geoapify_base_url()}/v1/geocode/search?text={city}&apiKey={api_key}"
+
+    def request(timeout):
+        response = metrics.request("geoapify.geocode", "GET", url, timeout=timeout)
+        resilience.check_status(response, "Geoapify")
+        return response.json()
+
+    try:
+        data = resilience.call("geoapify", "geoapify.geocode", ("geoapify.geocode", city.strip().lower()), request)
+    except resilience.ClientError:
+        st.warning("⚠️ Couldn't look up that city. Please check the name and try again.")
+        return None, None
+    except Exception as e:
+        st.warning(f"⚠️ Failed to get city coordinates. Geoapify may be unavailable ({e}).")
+        return None, None
     try:
-        url = f"https://api.geoapify.com/v1/geocode/search?text={city}&apiKey={api_key}"
-        response = requests.get(url)
-        if response.status_code != 200:
-            st.warning("⚠️ Failed to get city coordinates. Geoapify may be unavailable.")
-            return None, None
-        data = response.json()
         lat = data["features"][0]["properties"]["lat"]
         lon = data["features"][0]["properties"]["lon"]
         return lat, lon
@@ -20,26 +55,236 @@ def get_city_coordinates(city, api_key):
         st.warning(f"⚠️ Error fetching coordinates: {e}")
         return None, None
 
-def get_pois(lat, lon, radius_meters, api_key, selected_categories):
-    try:
-        categories = ",".join(selected_categories) if selected_categories else \
-            "catering,entertainment,tourism,accommodation.hotel,accommodation.hostel,accommodation.motel,activity,commercial,leisure,national_park"
-        url = (
-            f"https://api.geoapify.com/v2/places"
-            f"?categories={categories}"
-            f"&filter=circle:{lon},{lat},{radius_meters}"
-            f"&limit=20"
-            f"&apiKey={api_key}"
-        )
-        response = requests.get(url)
-        if response.status_code != 200:
-            st.warning("⚠️ Failed to retrieve POIs from Geoapify.")
-            return {}
+def get_pois(lat, lon, radius_meters, api_key, selected_categories, limit=20):
+    categories = ",".join(selected_categories) if selected_categories else \
+        "catering,entertainment,tourism,accommodation.hotel,accommodation.hostel,accommodation.motel,activity,commercial,leisure,national_park"
+    url = (
+        f"{geoapify_base_url()}/v2/places"
+        f"?categories={categories}"
+        f"&filter=circle:{lon},{lat},{radius_meters}"
+        f"&limit={limit}"
+        f"&apiKey={api_key}"
+    )
+
+    def request(timeout):
+        response = metrics.request("geoapify.places", "GET", url, timeout=timeout)
+        resilience.check_status(response, "Geoapify")
         return response.json()
+
+    try:
+        return resilience.call("geoapify", "geoapify.places", ("geoapify.places", lat, lon, radius_meters, categories, limit), request)
+    except resilience.ClientError:
+        # An invalid search; the page reports no places
+        return {}
     except Exception as e:
-        st.warning(f"⚠️ Error fetching POIs: {e}")
+        st.warning(f"⚠️ Failed to retrieve POIs from Geoapify ({e}).")
         return {}
 
+def haversine_miles(lat, lon, lats, lons):
+    # Vectorized great-circle distance from one point to arrays of points
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+def compact_pois(pois):
+    # Only the fields the page shows; raw Geoapify features carry the full OSM record
+    records = []
+    for poi in pois:
+        props = poi.get("properties", {})
+        records.append({
+            "place_id": props.get("place_id"),
+            "name": props.get("name", "Unnamed Place"),
+            "category": props.get("categories", ["Unknown"])[0].split("/")[-1],
+            "address": props.get("address_line2", ""),
+            "lat": props.get("lat"),
+            "lon": props.get("lon"),
+        })
+    return records
+
+def pois_to_frame(records):
+    return pd.DataFrame(records, columns=POI_COLUMNS).astype({"lat": float, "lon": float})
+
+def dedupe_pois(df, radius_meters=DUPLICATE_RADIUS_METERS):
+    # The same place id is a duplicate; so is a named place within radius_meters of a kept place
+    # with the same name. Grid cells are radius-sized, so only the 3x3 neighbouring cells are checked.
+    has_id = df["place_id"].notna()
+    df = pd.concat([df[has_id].drop_duplicates(subset=["place_id"]), df[~has_id]])
+
+    names = df["name"].fillna("").str.lower().to_numpy()
+    lats = df["lat"].to_numpy()
+    lons = df["lon"].to_numpy()
+    cell_deg = radius_meters / 111_320
+    lat_cells = np.floor(lats / cell_deg)
+    lon_cells = np.floor(lons * np.cos(np.radians(lats)) / cell_deg)
+
+    keep = np.ones(len(df), dtype=bool)
+    kept = {}  # (name, lat cell, lon cell) -> [(lat, lon)] of kept places
+    for i in range(len(df)):
+        # Without a real name or coordinates there is nothing to match on
+        if names[i] in ("", "unnamed place") or np.isnan(lats[i]) or np.isnan(lons[i]):
+            continue
+        cell = (int(lat_cells[i]), int(lon_cells[i]))
+        nearby = [point for d_lat in (-1, 0, 1) for d_lon in (-1, 0, 1)
+                  for point in kept.get((names[i], cell[0] + d_lat, cell[1] + d_lon), ())]
+        if nearby:
+            nearby_lats, nearby_lons = np.array(nearby).T
+            if haversine_miles(lats[i], lons[i], nearby_lats, nearby_lons).min() * 1609.34 <= radius_meters:
+                keep[i] = False
+                continue
+        kept.setdefault((names[i],) + cell, []).append((lats[i], lons[i]))
+    return df[keep]
+
+def add_distances(df, lat, lon):
+    df = df.copy()
+    df["distance_mi"] = haversine_miles(lat, lon, df["lat"].to_numpy(), df["lon"].to_numpy())
+    df["distance_label"] = df["distance_mi"].map(lambda d: "N/A" if np.isnan(d) else f"{d:.1f} mi")
+    return df
+
+def sort_pois(df, option):
+    if option == "Name":
+        return df.sort_values("name", key=lambda s: s.str.lower(), kind="stable")
+    elif option == "Category":
+        return df.sort_values(["category", "distance_mi"], kind="stable")
+    return df.sort_values("distance_mi", kind="stable", na_position="last")
+
+def plan_destinations(plan, airports_df):
+    # Every distinct flight destination in a plan, located from the airport catalog (no geocoding)
+    codes = list(dict.fromkeys(flight.get("to") for flight in plan.get("flights", []) if flight.get("to")))
+    airports = airports_df.set_index("iata_code")
+    destinations, missing = [], []
+    for code in codes:
+        if code in airports.index:
+            row = airports.loc[code]
+            destinations.append({"code": code, "name": row["name"], "lat": float(row["latitude"]), "lon": float(row["longitude"])})
+        else:
+            missing.append(code)
+    return destinations, missing
+
+def fetch_pois_concurrently(destinations, radius_meters, api_key, selected_categories, limit):
+    # One get_pois per destination, in parallel, so the wait is about one round trip instead of N
+    ctx = get_script_run_ctx()
+
+    def fetch(destination):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        response = get_pois(destination["lat"], destination["lon"], radius_meters, api_key, selected_categories, limit)
+        return response.get("features", [])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_FETCHES, len(destinations)))) as pool:
+        # Workers share the page's deadline through the copied context
+        futures = [resilience.submit_with_context(pool, fetch, destination) for destination in destinations]
+        return [future.result() for future in futures]
+
+def show_poi_cards(poi_df, plan_names, added_plan_feedback, key_prefix=""):
+    page_count = max(1, -(-len(poi_df) // POIS_PER_PAGE))
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"{key_prefix}poi_page") if page_count > 1 else 1
+    page_df = poi_df.iloc[(page - 1) * POIS_PER_PAGE:page * POIS_PER_PAGE]
+
+    for idx, poi in page_df.iterrows():
+        name = poi["name"]
+        category = poi["category"]
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.markdown(f"- **{name}** ({category})")
+        with col2:
+            st.markdown(f"📏 {poi['distance_label']}")
+        with col3:
+            with st.expander("➕ Add to Travel Plan"):
+                plan_key = f"{key_prefix}plan_select_{idx}"
+                if plan_key not in st.session_state:
+                    st.session_state[plan_key] = plan_names[0] if plan_names else None
+
+                selected_plan = st.selectbox("Select a Plan", plan_names, key=plan_key)
+
+                if st.button("Add to Plan", key=f"{key_prefix}add_btn_{idx}"):
+                    st.session_state["pending_poi_add"] = {
+                        "name": name,
+                        "category": category,
+                        "plan": selected_plan
+                    }
+
+                    st.rerun()
+
+                key = name + category
+                if key in added_plan_feedback:
+                    st.success(f"✅ POI added to '{added_plan_feedback[key]}'!")
+
+def show_poi_map(poi_df, lat, lon, zoom, tooltip):
+    with st.expander("🗺️ View POIs on Map"):
+        try:
+            map_df = poi_df.dropna(subset=["lat", "lon"])
+
+            if not map_df.empty:
+                layer = pdk.Layer(
+                    "ScatterplotLayer",
+                    data=map_df,
+                    get_position='[lon, lat]',
+                    get_radius=300,
+                    get_fill_color="color",
+                    pickable=True
+                )
+
+                view = pdk.ViewState(
+                    latitude=lat,
+                    longitude=lon,
+                    zoom=zoom,
+                    pitch=0
+                )
+
+                st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view, tooltip={"html": tooltip}))
+            else:
+                st.warning("Map data not available for these POIs.")
+        except Exception as e:
+            st.warning(f"⚠️ Error displaying map: {e}")
+
+def show_city_results(pois, search, plan_names, added_plan_feedback):
+    city = search["city"]
+    lat = search["lat"]
+    lon = search["lon"]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        airports_df = airport_catalog.load_airports()
+        origin_option = st.selectbox("Measure distance from", [f"{city} city center"] + list(airports_df["display_name"]))
+    with col2:
+        sort_option = st.selectbox("Sort POIs By", ["Distance", "Name", "Category"])
+
+    if origin_option in set(airports_df["display_name"]):
+        origin_row = airports_df[airports_df["display_name"] == origin_option].iloc[0]
+        origin_lat, origin_lon = origin_row["latitude"], origin_row["longitude"]
+    else:
+        origin_lat, origin_lon = lat, lon
+
+    poi_df = sort_pois(add_distances(pois_to_frame(pois), origin_lat, origin_lon), sort_option)
+
+    st.markdown(f"### 🧭 Points of Interest near {city}:")
+    show_poi_cards(poi_df, plan_names, added_plan_feedback)
+
+    poi_df = poi_df.assign(color=[MAP_COLORS[0]] * len(poi_df))
+    show_poi_map(poi_df, lat, lon, 10, "{name}<br/>{address}<br/>📏 {distance_label}")
+
+def show_plan_results(pois, search, plan_names, added_plan_feedback):
+    destinations = search["destinations"]
+    sort_option = st.selectbox("Sort POIs By", ["Distance", "Name", "Category"])
+
+    st.markdown(f"### 🧳 Points of Interest for '{search['plan']}'")
+    groups = []
+    for i, destination in enumerate(destinations):
+        group = [poi for poi in pois if poi["near"] == destination["code"]]
+        group_df = sort_pois(add_distances(pois_to_frame(group), destination["lat"], destination["lon"]), sort_option)
+        st.markdown(f"#### 🧭 Near {destination['name']} ({destination['code']}) · {len(group_df)} places")
+        show_poi_cards(group_df, plan_names, added_plan_feedback, key_prefix=f"{destination['code']}_")
+        groups.append(group_df.assign(near=destination["code"], color=[MAP_COLORS[i % len(MAP_COLORS)]] * len(group_df)))
+
+    if groups:
+        combined = pd.concat(groups, ignore_index=True)
+        center_lat = sum(d["lat"] for d in destinations) / len(destinations)
+        center_lon = sum(d["lon"] for d in destinations) / len(destinations)
+        show_poi_map(combined, center_lat, center_lon, 10 if len(destinations) == 1 else 4,
+                     "{name}<br/>{address}<br/>📏 {distance_label} from {near}")
+
 def main():
     st.title("📍 Plane N Simple: POI Search")
     st.markdown("Find cool places near your destination using Geoapify APIs!")
@@ -91,24 +336,60 @@ def main():
         selected = st.multiselect(f"Select {category_group} Types", list(categories[category_group.lower()].values()))
         selected_categories = [k for k, v in categories[category_group.lower()].items() if v in selected] if selected else list(categories[category_group.lower()].keys())
 
-    with st.form("poi_search_form"):
-        city = st.text_input("Enter a city (e.g., Miami)")
-        radius_miles = st.selectbox("Search radius (miles)", [5, 10, 20, 50], index=1)
-        filter_button = st.form_submit_button("Filter")
+    search_mode = st.radio("Search near", ["A City", "Every Destination in a Travel Plan"], horizontal=True, key="poi_search_mode")
 
-    if filter_button:
-        lat, lon = get_city_coordinates(city, GEOAPIFY_API_KEY)
-        if lat is None or lon is None:
+    if search_mode == "A City":
+        with st.form("poi_search_form"):
+            city = st.text_input("Enter a city (e.g., Miami)")
+            radius_miles = st.selectbox("Search radius (miles)", [5, 10, 20, 50], index=1)
+            max_results = st.selectbox("Max results", [20, 100, 500], index=0)
+            filter_button = st.form_submit_button("Filter")
+            discover_button = False
+    else:
+        with st.form("poi_plan_search_form"):
+            plan_name = st.selectbox("Travel Plan", plan_names)
+            radius_miles = st.selectbox("Search radius (miles)", [5, 10, 20, 50], index=1)
+            max_results = st.selectbox("Max results per destination", [20, 100, 500], index=0)
+            discover_button = st.form_submit_button("Discover for This Plan")
+            filter_button = False
+
+    if discover_button and plan_name:
+        plan = json.loads(travel_plans[plan_name]) if isinstance(travel_plans[plan_name], str) else travel_plans[plan_name]
+        destinations, missing = plan_destinations(plan, airport_catalog.load_airports())
+        if missing:
+            st.warning(f"⚠️ Skipping destinations not in our airport list: {', '.join(missing)}")
+        if not destinations:
+            st.warning("⚠️ This plan has no flights with a known destination airport yet.")
             return
 
         radius_meters = radius_miles * 1609.34
-        response = get_pois(lat, lon, radius_meters, GEOAPIFY_API_KEY, selected_categories)
-        pois = response.get("features", [])
+        with resilience.action(SEARCH_DEADLINE_SECONDS) as current:
+            results = fetch_pois_concurrently(destinations, radius_meters, GEOAPIFY_API_KEY, selected_categories, max_results)
+
+        records = []
+        for destination, features in zip(destinations, results):
+            group = dedupe_pois(pois_to_frame(compact_pois(features))).to_dict("records")
+            records.extend({**poi, "near": destination["code"]} for poi in group)
+        search_key = ("plan", plan_name, tuple(d["code"] for d in destinations), radius_miles, tuple(selected_categories or ()), max_results)
+        if records or not current.errors:
+            session_cache.put("pois", search_key, records, meta={"plan": plan_name, "destinations": destinations, "stale": current.stale_times()})
+            st.session_state.poi_search = search_key
+
+    if filter_button:
+        with resilience.action(SEARCH_DEADLINE_SECONDS) as current:
+            lat, lon = get_city_coordinates(city, GEOAPIFY_API_KEY)
+            if lat is None or lon is None:
+                return
+
+            radius_meters = radius_miles * 1609.34
+            response = get_pois(lat, lon, radius_meters, GEOAPIFY_API_KEY, selected_categories, max_results)
+            pois = response.get("features", [])
 
-        st.session_state.pois = pois
-        st.session_state.city = city
-        st.session_state.lat = lat
-        st.session_state.lon = lon
+        records = dedupe_pois(pois_to_frame(compact_pois(pois))).to_dict("records")
+        search_key = (city, radius_miles, tuple(selected_categories or ()), max_results)
+        if records or not current.errors:
+            session_cache.put("pois", search_key, records, meta={"city": city, "lat": lat, "lon": lon, "stale": current.stale_times()})
+            st.session_state.poi_search = search_key
 
     added_plan_feedback = {}
 
@@ -130,74 +411,15 @@ def main():
         plan_ref.set(json.dumps(plan))
         added_plan_feedback[data["name"] + data["category"]] = data["plan"]
 
-    if "pois" in st.session_state:
-        pois = st.session_state.pois
-        city = st.session_state.city
-        lat = st.session_state.lat
-        lon = st.session_state.lon
-
-        st.markdown(f"### 🧭 Points of Interest near {city}:")
-        for idx, poi in enumerate(pois):
-            props = poi.get("properties", {})
-            name = props.get("name", "Unnamed Place")
-            category = props.get("categories", ["Unknown"])[0].split("/")[-1]
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.markdown(f"- **{name}** ({category})")
-            with col3:
-                with st.expander("➕ Add to Travel Plan"):
-                    plan_key = f"plan_select_{idx}"
-                    if plan_key not in st.session_state:
-                        st.session_state[plan_key] = plan_names[0] if plan_names else None
-
-                    selected_plan = st.selectbox("Select a Plan", plan_names, key=plan_key)
-
-                    if st.button("Add to Plan", key=f"add_btn_{idx}"):
-                        st.session_state["pending_poi_add"] = {
-                            "name": name,
-                            "category": category,
-                            "plan": selected_plan
-                        }
-
-                        st.rerun()
-
-                    key = name + category
-                    if key in added_plan_feedback:
-                        st.success(f"✅ POI added to '{added_plan_feedback[key]}'!")
-
-        with st.expander("🗺️ View POIs on Map"):
-            try:
-                map_df = [{
-                    "name": poi["properties"].get("name", "Unnamed"),
-                    "address": poi["properties"].get("address_line2", ""),
-                    "lat": poi["properties"]["lat"],
-                    "lon": poi["properties"]["lon"]
-                } for poi in pois if "lat" in poi["properties"] and "lon" in poi["properties"]]
-
-                if map_df:
-                    layer = pdk.Layer(
-                        "ScatterplotLayer",
-                        data=map_df,
-                        get_position='[lon, lat]',
-                        get_radius=300,
-                        get_color=[0, 100, 255, 160],
-                        pickable=True
-                    )
-
-                    view = pdk.ViewState(
-                        latitude=lat,
-                        longitude=lon,
-                        zoom=10,
-                        pitch=0
-                    )
-
-                    st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view, tooltip={"html": "{name}<br/>{address}"}))
-                else:
-                    st.warning("Map data not available for these POIs.")
-            except Exception as e:
-                st.warning(f"⚠️ Error displaying map: {e}")
+    pois = session_cache.get("pois", st.session_state.get("poi_search"))
+    if pois is not None:
+        search = session_cache.get_meta("pois", st.session_state.poi_search)
+        if search.get("stale"):
+            st.warning(f"🕒 Geoapify is slow or unavailable, so some of these are saved results from {search['stale']['geoapify']}.")
+        if "destinations" in search:
+            show_plan_results(pois, search, plan_names, added_plan_feedback)
+        else:
+            show_city_results(pois, search, plan_names, added_plan_feedback)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+# price_watch.py
+# Opt-in background re-pricing of flights saved to travel plans.
+#
+# Database layout:
+#   price_watch/{ORIGIN}_{DEST}_{YYYY-MM-DD}/{flight key}/{uid}/{plan name} = true
+#   price_history/{ORIGIN}_{DEST}_{YYYY-MM-DD}/{flight key}/{epoch seconds} = price
+#
+# Watches are grouped by route and date, so each cycle queries Amadeus once per route no
+# matter how many users watch flights on it. History is append-only and keyed by time, so
+# a chart reads only its last N points with order_by_key().limit_to_last(N).
+import threading
+import time
+from datetime import date, datetime
+import streamlit as st
+from firebase_admin import db
+
+import amadeus_client
+
+DEFAULT_INTERVAL_MINUTES = 60
+# Amadeus self-service allows 10 requests/second in test and 40 in production; stay well under
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+HISTORY_POINTS = 90
+
+
+def settings():
+    try:
+        config = st.secrets["price_watch"]
+    except Exception:
+        config = {}
+    return {
+        "enabled": bool(config.get("enabled", False)),
+        "interval_minutes": float(config.get("interval_minutes", DEFAULT_INTERVAL_MINUTES)),
+        "requests_per_second": float(config.get("requests_per_second", DEFAULT_REQUESTS_PER_SECOND)),
+    }
+
+
+def route_key(origin, dest, departure):
+    return f"{origin}_{dest}_{departure[:10]}"
+
+
+def flight_key(carrier, departure):
+    # "AA", "2030-01-01T08:00:00" -> "AA_20300101T0800"
+    return f"{carrier}_{departure[:16].replace('-', '').replace(':', '')}"
+
+
+def watch_flight(uid, plan_name, flight):
+    # flight is a saved plan entry (see flight_search.flight_data); returns the watch path
+    route = route_key(flight["from"], flight["to"], flight["departure"])
+    key = flight_key(flight["airline"], flight["departure"])
+    db.reference(f"price_watch/{route}/{key}/{uid}/{plan_name}").set(True)
+    return f"{route}/{key}"
+
+
+def unwatch_flight(uid, plan_name, watch):
+    db.reference(f"price_watch/{watch}/{uid}/{plan_name}").delete()
+
+
+def price_series(watch, points=HISTORY_POINTS):
+    # Last `points` prices for one watched flight as [(datetime, price)], oldest first
+    history = db.reference(f"price_history/{watch}").order_by_key().limit_to_last(points).get() or {}
+    return [(datetime.fromtimestamp(int(ts)), price) for ts, price in sorted(history.items())]
+
+
+class RateLimiter:
+    # Token bucket: at most `rate` acquisitions per second, with bursts of up to `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PriceWatcher:
+    def __init__(self, interval_minutes, requests_per_second):
+        self.interval = interval_minutes * 60
+        self.limiter = RateLimiter(requests_per_second)
+        self.stop_event = threading.Event()
+        # The worker thread and the admin "Re-price Now" button must never run cycles at once
+        self.cycle_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="price-watch", daemon=True)
+        self.status = {"cycles": 0, "last_cycle": None, "routes": 0, "queries": 0, "failed_routes": 0, "points": 0, "last_error": None}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self.status["last_error"] = f"{type(e).__name__}: {e}"
+            self.stop_event.wait(self.interval)
+
+    def run_cycle(self):
+        # Returns None without doing anything when another cycle is already running
+        if not self.cycle_lock.acquire(blocking=False):
+            return None
+        try:
+            return self._run_cycle()
+        finally:
+            self.cycle_lock.release()
+
+    def _run_cycle(self):
+        routes = db.reference("price_watch").get(shallow=True) or {}
+        today = date.today().isoformat()
+        timestamp = str(int(time.time()))
+        queries = points = failed = 0
+        last_error = None
+
+        for route in sorted(routes):
+            origin, dest, day = route.split("_")
+            if day < today:
+                continue
+            watched = db.reference(f"price_watch/{route}").get(shallow=True) or {}
+            if not watched:
+                continue
+
+            self.limiter.acquire()
+            queries += 1
+            try:
+                offers = amadeus_client.fetch_flight_offers(origin, dest, date.fromisoformat(day))
+            except Exception as e:
+                # No st.* here: this runs on the worker thread. The failure shows on the admin panel.
+                failed += 1
+                last_error = f"{route}: {type(e).__name__}: {e}"
+                continue
+
+            # Cheapest current fare for each watched flight on this route
+            prices = {}
+            for offer in map(amadeus_client.compact_offer, offers):
+                segment = offer["segments"][0]
+                key = flight_key(segment["carrier"], segment["departure"])
+                if key in watched:
+                    prices[key] = min(prices.get(key, float("inf")), float(offer["price"]))
+
+            if prices:
+                db.reference(f"price_history/{route}").update({f"{key}/{timestamp}": price for key, price in prices.items()})
+                points += len(prices)
+
+        self.status.update({
+            "cycles": self.status["cycles"] + 1,
+            "last_cycle": datetime.now().isoformat(timespec="seconds"),
+            "routes": len(routes),
+            "queries": queries,
+            "failed_routes": failed,
+            "points": points,
+            "last_error": last_error,
+        })
+        return self.status
+
+
+@st.cache_resource
+def start_worker():
+    # One watcher thread per server process
+    config = settings()
+    return PriceWatcher(config["interval_minutes"], config["requests_per_second"]).start()
@@ -0,0 +1,227 @@
+# resilience.py
+# Deadlines, hedged requests, per-provider circuit breakers and stale-result fallback
+# for calls to Amadeus and Geoapify.
+#
+# A page wraps one user action in `with resilience.action(seconds):`. Every upstream call
+# made inside it gets the time that is left, sends a duplicate request once the call runs
+# past the endpoint's observed p95, and fails fast while its provider's breaker is open.
+# If a call cannot be answered in time, the last good result for the same request is
+# served instead and the action records which providers were served stale data.
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import metrics
+
+DEFAULT_CALL_TIMEOUT_SECONDS = 10.0
+# Hedge only once p95 is based on enough calls, and never sooner than this
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.05
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+STALE_CACHE_ENTRIES = 256
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream")
+_current_action = contextvars.ContextVar("resilience_action", default=None)
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class ClientError(Exception):
+    # The provider answered but rejected the request (4xx); it is not a sign of an outage
+    pass
+
+
+def check_status(response, provider):
+    # 4xx -> ClientError, anything else that is not a 200 -> UpstreamError
+    if 400 <= response.status_code < 500:
+        raise ClientError(f"{provider} rejected the request ({response.status_code})")
+    if response.status_code != 200:
+        raise UpstreamError(f"{provider} returned {response.status_code}")
+
+
+class Action:
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds
+        self.stale = {}  # provider -> when the served result was fetched
+        self.errors = {}  # provider -> last failure that could not be covered by a cached result
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def stale_times(self):
+        # provider -> "HH:MM" of the cached result served for it, for the page's notice
+        return {provider: fetched_at.strftime("%H:%M") for provider, fetched_at in self.stale.items()}
+
+
+class action:
+    # with resilience.action(15) as current: ...; current.stale tells the page what was cached
+    def __init__(self, seconds):
+        self.current = Action(seconds)
+
+    def __enter__(self):
+        self.token = _current_action.set(self.current)
+        return self.current
+
+    def __exit__(self, *exc):
+        _current_action.reset(self.token)
+        return False
+
+
+class CircuitBreaker:
+    # Opens after consecutive failures; after the cooldown one trial call is let through
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_stale_cache = OrderedDict()
+_stale_lock = threading.Lock()
+
+
+def breaker(provider):
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker()
+        return _breakers[provider]
+
+
+def breaker_states():
+    with _breakers_lock:
+        return {provider: b.state for provider, b in _breakers.items()}
+
+
+def _remember(cache_key, value):
+    with _stale_lock:
+        _stale_cache.pop(cache_key, None)
+        _stale_cache[cache_key] = (value, datetime.now())
+        while len(_stale_cache) > STALE_CACHE_ENTRIES:
+            _stale_cache.popitem(last=False)
+
+
+def _cached(cache_key):
+    with _stale_lock:
+        return _stale_cache.get(cache_key)
+
+
+def _hedged(endpoint, request_fn, timeout):
+    # Primary request, plus one duplicate if it is still running after the endpoint's p95;
+    # both share the same deadline
+    deadline = time.monotonic() + timeout
+    p95 = metrics.percentile(endpoint, 95, min_samples=HEDGE_MIN_SAMPLES)
+    futures = [_executor.submit(request_fn, timeout)]
+    if p95 is not None and max(p95, HEDGE_MIN_DELAY_SECONDS) < timeout:
+        done, _ = wait(futures, timeout=max(p95, HEDGE_MIN_DELAY_SECONDS))
+        if not done:
+            futures.append(_executor.submit(request_fn, deadline - time.monotonic()))
+
+    pending = set(futures)
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                raise UpstreamError(f"no response within {timeout:.1f}s")
+            for future in done:
+                try:
+                    return future.result()
+                except ClientError:
+                    raise
+                except Exception as e:
+                    error = e
+        raise error
+    finally:
+        # Requests still queued behind a busy executor would only reach the upstream after the
+        # caller gave up; a request already running cannot be stopped and ends at its own timeout
+        for future in pending:
+            future.cancel()
+
+
+def fallback(provider, cache_key, error):
+    # Inside a page action, serve the last good result for cache_key; otherwise raise `error`.
+    # Background jobs always see the failure rather than stale data.
+    current = _current_action.get()
+    cached = _cached(cache_key) if cache_key is not None else None
+    if current is None or cached is None:
+        if current is not None:
+            current.errors[provider] = str(error)
+        raise error
+    value, fetched_at = cached
+    current.stale[provider] = fetched_at
+    return value
+
+
+def call(provider, endpoint, cache_key, request_fn):
+    # request_fn(timeout) returns the result or raises ClientError/UpstreamError/requests errors.
+    # Pass cache_key=None for results that must never be served stale.
+    current = _current_action.get()
+    timeout = current.remaining() if current else DEFAULT_CALL_TIMEOUT_SECONDS
+    provider_breaker = breaker(provider)
+
+    try:
+        if timeout <= 0:
+            raise UpstreamError("deadline already passed")
+        if not provider_breaker.allow():
+            raise UpstreamError(f"{provider} is degraded; skipping the request")
+        try:
+            value = _hedged(endpoint, request_fn, timeout)
+        except ClientError:
+            # The provider is up; the request itself was bad
+            provider_breaker.record_success()
+            raise
+        except Exception:
+            provider_breaker.record_failure()
+            raise
+        provider_breaker.record_success()
+        if cache_key is not None:
+            _remember(cache_key, value)
+        return value
+    except ClientError:
+        raise
+    except Exception as e:
+        return fallback(provider, cache_key, e)
+
+
+def submit_with_context(pool, fn, *args):
+    # ThreadPoolExecutor does not copy contextvars; this keeps the current action in workers
+    return pool.submit(contextvars.copy_context().run, fn, *args)
@@ -0,0 +1,107 @@
+# session_cache.py
+# Per-session store for search results with a byte budget.
+#
+# Pages keep compact projections of their results here instead of raw API payloads.
+# Each session's searches are kept oldest-first and the oldest ones are evicted once
+# the session goes over its budget; the newest search is always kept.
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+DEFAULT_SESSION_BUDGET_BYTES = 512 * 1024
+
+# Without a Streamlit server to ask which sessions are connected (bare mode, tests), sessions
+# that have not stored anything for this long are dropped from the admin report
+SESSION_IDLE_SECONDS = 60 * 60
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def session_budget_bytes():
+    # [limits] session_cache_bytes in secrets.toml, or the SESSION_CACHE_BYTES env var
+    try:
+        return int(st.secrets["limits"]["session_cache_bytes"])
+    except Exception:
+        return int(os.environ.get("SESSION_CACHE_BYTES", DEFAULT_SESSION_BUDGET_BYTES))
+
+
+def record_bytes(records):
+    # Approximate size as compact JSON; cheap and stable across Python versions
+    return len(json.dumps(records, separators=(",", ":"), default=str))
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def _cache():
+    if "_search_cache" not in st.session_state:
+        st.session_state._search_cache = OrderedDict()
+    return st.session_state._search_cache
+
+
+def _publish(cache):
+    with _lock:
+        _sessions[_session_id()] = {
+            "searches": len(cache),
+            "bytes": sum(entry["bytes"] for entry in cache.values()),
+            "updated": time.time(),
+        }
+
+
+def put(kind, key, records, meta=None):
+    cache = _cache()
+    cache_key = (kind, key)
+    cache.pop(cache_key, None)
+    cache[cache_key] = {"records": records, "meta": meta or {}, "bytes": record_bytes(records) + record_bytes(meta or {})}
+
+    budget = session_budget_bytes()
+    total = sum(entry["bytes"] for entry in cache.values())
+    while total > budget and len(cache) > 1:
+        _, evicted = cache.popitem(last=False)
+        total -= evicted["bytes"]
+
+    _publish(cache)
+    return records
+
+
+def get(kind, key):
+    entry = _cache().get((kind, key))
+    return entry["records"] if entry else None
+
+
+def get_meta(kind, key):
+    entry = _cache().get((kind, key))
+    return entry["meta"] if entry else None
+
+
+def entries(kind):
+    # All cached searches of one kind, oldest first
+    return [(key, entry["records"]) for (entry_kind, key), entry in _cache().items() if entry_kind == kind]
+
+
+def report():
+    # One row per live session in this server process, plus the process-wide total
+    now = time.time()
+    server = runtime.get_instance() if runtime.exists() else None
+    with _lock:
+        # Closed tabs are gone from the runtime; their cached results go with their session state
+        if server is not None:
+            closed = [sid for sid in _sessions if not server.is_active_session(sid)]
+        else:
+            closed = [sid for sid, usage in _sessions.items() if now - usage["updated"] > SESSION_IDLE_SECONDS]
+        for session_id in closed:
+            del _sessions[session_id]
+        rows = [
+            {"session": session_id[:8], "searches": usage["searches"], "bytes": usage["bytes"], "idle_s": round(now - usage["updated"])}
+            for session_id, usage in _sessions.items()
+        ]
+    rows.sort(key=lambda row: row["bytes"], reverse=True)
+    return rows, sum(row["bytes"] for row in rows)
@@ -0,0 +1,126 @@
+# startup_profile.py
+# Import-time profiler for the app's cold start and for each lazily loaded page.
+#
+#   python startup_profile.py                    # report only
+#   python startup_profile.py --budget-ms 1500   # exit 1 if cold start is over budget
+#
+# Every measurement runs in a fresh interpreter with `python -X importtime`, so
+# nothing is served from an already-warm sys.modules.
+import argparse
+import ast
+import importlib.machinery
+import importlib.util
+import os
+import subprocess
+import sys
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+PAGE_MODULES = ["home", "travel_plans", "flight_search", "poi_search", "profile_page", "admin_page"]
+
+DEFAULT_BUDGET_MS = 2000
+
+
+def startup_modules(app_file=APP_FILE):
+    # What app.py imports on every cold start: its module-level import statements, minus the
+    # standard library (pages are imported lazily by app.PAGES). `from pkg import sub` counts
+    # pkg.sub when sub is a submodule, e.g. firebase_admin.db.
+    with open(app_file) as f:
+        tree = ast.parse(f.read(), app_file)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+            # Look submodules up on the package path without importing the package here
+            spec = importlib.util.find_spec(node.module) if "." not in node.module else None
+            search_path = spec.submodule_search_locations if spec else None
+            for alias in node.names:
+                if search_path and importlib.machinery.PathFinder.find_spec(alias.name, search_path):
+                    names.append(f"{node.module}.{alias.name}")
+        else:
+            continue
+        modules += [name for name in names if name.split(".")[0] not in sys.stdlib_module_names and name not in modules]
+    return modules
+
+
+def import_times(preload, module):
+    # Returns {module name: cumulative microseconds} for `module` and everything it newly imports
+    code = "".join(f"import {name}; " for name in preload) + f"import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative_us)))
+
+    # -X importtime prints children before their parent, so the subtree is the
+    # run of more deeply indented lines just above the module's own line
+    matches = [i for i, (_, name, _) in enumerate(entries) if name == module]
+    if not matches:
+        return {}  # already imported by something in `preload`
+    end = matches[-1]
+    depth = entries[end][0]
+    start = end
+    while start > 0 and entries[start - 1][0] > depth:
+        start -= 1
+    return {name: us for _, name, us in entries[start:end + 1]}
+
+
+def top_level_ms(times, module):
+    return times.get(module, 0) / 1000
+
+
+def heaviest(times, count):
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import cost and enforce a cold-start budget.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--top", type=int, default=5, help="heaviest transitive imports to list per module")
+    args = parser.parse_args()
+
+    print("Cold start (imported by app.py on every process start):")
+    cold_start_ms = 0.0
+    loaded = []
+    preload = startup_modules()
+    for module in preload:
+        times = import_times(loaded, module)
+        cost = top_level_ms(times, module)
+        cold_start_ms += cost
+        loaded.append(module)
+        print(f"  {module:<24}{cost:>10.1f} ms")
+        for name, us in heaviest(times, args.top):
+            if name != module:
+                print(f"      {name:<36}{us / 1000:>8.1f} ms")
+
+    print("\nPages (imported on first selection, on top of the cold start):")
+    for module in PAGE_MODULES:
+        try:
+            times = import_times(preload, module)
+        except RuntimeError as e:
+            print(f"  {module:<24}{'failed':>10}  {e}")
+            continue
+        print(f"  {module:<24}{top_level_ms(times, module):>10.1f} ms")
+        for name, us in heaviest(times, args.top):
+            if name != module:
+                print(f"      {name:<36}{us / 1000:>8.1f} ms")
+
+    print(f"\nCold start total: {cold_start_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if cold_start_ms > args.budget_ms:
+        print("❌ Cold start is over budget.")
+        sys.exit(1)
+    print("✅ Cold start is within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 import streamlit as st
 from firebase_admin import db
 import json
+import pandas as pd
+
+import price_watch
 
 def delete_entire_plan(uid, plan_name):
     try:
-        db.reference(f"travel_plans/{uid}/{plan_name}").delete()
+        ref = db.reference(f"travel_plans/{uid}/{plan_name}")
+        plan = json.loads(ref.get() or "{}")
+        for flight in plan.get("flights", []):
+            if flight.get("watch"):
+                price_watch.unwatch_flight(uid, plan_name, flight["watch"])
+        ref.delete()
         st.success(f"🗑 Deleted travel plan: {plan_name}")
     except Exception as e:
         st.error(f"❌ Failed to delete travel plan: {e}")
@@ -35,12 +43,25 @@ def delete_item_from_plan(uid, plan_name, item_type, index):
         ref = db.reference(f"travel_plans/{uid}/{plan_name}")
         plan = json.loads(ref.get())
         if 0 <= index < len(plan.get(item_type)):
-            plan.get(item_type).pop(index)
+            item = plan.get(item_type).pop(index)
+            if item.get("watch"):
+                price_watch.unwatch_flight(uid, plan_name, item["watch"])
             ref.set(json.dumps(plan))
     except Exception as e:
         st.error(f"❌ Failed to delete item from plan: {e}")
 
 
+def show_price_history(watch):
+    series = price_watch.price_series(watch)
+    if len(series) < 2:
+        st.caption("🔔 Watching this price. History appears after the next re-pricing runs.")
+        return
+    history = pd.DataFrame(series, columns=["time", "price"]).set_index("time")
+    first, last = history["price"].iloc[0], history["price"].iloc[-1]
+    st.caption(f"🔔 Price now {last:.2f} ({last - first:+.2f} since watching started)")
+    st.line_chart(history, height=160)
+
+
 def main():
     st.title("📘 Your Travel Plans")
 
@@ -82,6 +103,8 @@ def main():
                         st.markdown(f"Departure: {flight.get('departure')}")
                         st.markdown(f"Arrival: {flight.get('arrival')}")
                         st.markdown(f"Duration: {flight.get('duration', 'N/A')}  ")
+                        if flight.get("watch"):
+                            show_price_history(flight["watch"])
                 
                     with col2:
                         if st.button(f"❌ Remove Flight #{i+1}", key=f"rm_flight_{plan_name}_{i}"):